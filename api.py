@@ -0,0 +1,331 @@
+"""HTTP/JSON service in front of submissions.db and the scoring rubric.
+
+    python api.py --db submissions.db --snapshot snapshot.db --port 8600
+
+Other systems use it to score sites and to save and list submissions
+without the Streamlit app:
+
+    POST /score                        body: a proposal, or a JSON array of up to MAX_BATCH of them
+    PUT /submissions/{facility_code}   body: a proposal
+    GET /submissions                   ?page=&page_size=&sort=&descending=&facility=&min_<score>=&max_<score>=
+    GET /version                       {"data_version": n}
+
+A proposal is a JSON object in the payload layout ({section: {field:
+value}}) or flat ({field: value}); see payload.parse. Scoring returns the
+derived fields (cost ratio, recommended docks and the scores) under the
+current rubric, exactly as the form computes them: one proposal through
+``Rubric.score_proposal``, a batch through ``scoring.score_frame``. Like
+the form, hubs_radius is counted from the proposal's coordinates (the other
+facilities in the database within 20 km) and returned too. Saved
+submissions are validated like the form first. Database work and batch
+scoring run in the thread pool, so the event loop keeps serving other
+clients meanwhile; SQLite in WAL mode lets the listing reads run alongside
+the writes. See apibench.py for requests/sec and latency.
+
+It is also how the app runs as several processes. One process owns the
+database. It applies the migrations, takes every write, and refreshes a
+read-only snapshot (``db.write_snapshot``) whenever the data has changed,
+at most every ``--snapshot-interval`` seconds; a failed refresh is logged
+and tried again at the next interval. The Streamlit app then runs as
+several worker processes, e.g. one per core behind a load balancer:
+
+    FACILITY_WRITE_API=http://127.0.0.1:8600 FACILITY_READ_DB=snapshot.db \\
+        streamlit run main_app.py --server.port 8501
+
+Each worker sends submissions here (``put_submission``) and reads the
+snapshot for dashboards and exports, which no write ever locks. A heavy
+export then holds up only its own worker. New submissions show on the
+dashboards after the next refresh. See loadtest.py for throughput
+against the number of workers.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import bulk_score
+import db
+import payload
+import rescore
+import scoring
+
+DEFAULT_PORT = 8600
+SNAPSHOT_INTERVAL = 5.0
+MAX_BATCH = 10000
+MAX_PAGE_SIZE = 500
+# Set in app workers to send submissions to the write API instead of the database.
+WRITE_API_URL = os.environ.get("FACILITY_WRITE_API")
+
+log = logging.getLogger(__name__)
+
+# db_path -> (data_version, bulk_score.hub_index) for counting hubs_radius
+_hub_indexes = {}
+
+
+# --- Client ---
+
+def put_submission(proposal, base_url=None, timeout=10.0):
+    """Save a Proposal through the write API; returns its scores.
+
+    Raises ValueError with the service's messages when it rejects the proposal.
+    """
+    errors = payload.validation_errors(proposal)
+    if errors:
+        raise ValueError(" ".join(errors))
+    base_url = (base_url or WRITE_API_URL).rstrip("/")
+    code = urllib.parse.quote(proposal.submitter.facility_code, safe="")
+    request = urllib.request.Request(
+        f"{base_url}/submissions/{code}",
+        data=json.dumps(proposal.to_dict()).encode(),
+        method="PUT",
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        if e.code in (400, 422):
+            raise ValueError(" ".join(json.load(e).get("errors", []))) from None
+        raise
+
+
+# --- Service ---
+
+def _save(db_path, proposal):
+    with db.connection(db_path) as conn:
+        db.save_submission(conn, proposal)
+
+
+def _data_version(db_path):
+    with db.connection(db_path) as conn:
+        return db.data_version(conn)
+
+
+def _hub_index(db_path):
+    """Facility locations of ``db_path``, rebuilt when its data changes."""
+    with db.connection(db_path) as conn:
+        version = db.data_version(conn)
+        cached = _hub_indexes.get(db_path)
+        if cached is None or cached[0] != version:
+            cached = _hub_indexes[db_path] = (version, bulk_score.hub_index(conn))
+    return cached[1]
+
+
+def _fill_hubs(db_path, proposal):
+    """Set hubs_radius from the proposal's coordinates, when they are valid."""
+    submitter = proposal.submitter
+    hubs = bulk_score.count_hubs(_hub_index(db_path), submitter.latitude, submitter.longitude, submitter.facility_code)
+    if hubs is not None:
+        proposal.operations_network.hubs_radius = hubs
+
+
+def _bad_request(message, status_code=400):
+    return JSONResponse({"errors": [message]}, status_code=status_code)
+
+
+def _records(frame):
+    """DataFrame -> JSON-ready records, NaN as null."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def _derived(proposal):
+    flat = payload.flatten(proposal)
+    return {field: flat[field] for field in ("hubs_radius", *payload.DERIVED_FIELDS)}
+
+
+def _score_one(db_path, data):
+    proposal = payload.parse(data)
+    _fill_hubs(db_path, proposal)
+    rescore.rescore_payload(proposal, scoring.current_rubric())
+    return {"facility_code": proposal.submitter.facility_code, **_derived(proposal)}
+
+
+def _score_batch(db_path, items):
+    """Derived fields of many proposals through the vectorized scorer, in input order."""
+    frame = payload.coerce_frame(pd.DataFrame([payload.flat_fields(item) for item in items]))
+    frame = bulk_score.fill_hubs(frame, _hub_index(db_path))
+    scores = scoring.score_frame(frame)
+    derived = pd.DataFrame({field: scores[column] for field, column in payload.DERIVED_FIELDS.items()})
+    derived.insert(0, "hubs_radius", frame["hubs_radius"].astype("Int64") if "hubs_radius" in frame else None)
+    derived.insert(0, "facility_code", frame["facility_code"] if "facility_code" in frame else None)
+    return _records(derived)
+
+
+def _list_submissions(db_path, query):
+    with db.connection(db_path) as conn:
+        total = db.count_summaries(conn, query["facilities"], query["score_ranges"])
+        rows, cols = db.summary_page(
+            conn, query["facilities"], query["score_ranges"], sort=query["sort"], descending=query["descending"],
+            limit=query["page_size"], offset=(query["page"] - 1) * query["page_size"],
+        )
+    return total, [dict(zip(cols, row)) for row in rows]
+
+
+def _listing_query(params):
+    """GET /submissions query string -> summary_page arguments; raises ValueError."""
+    try:
+        page = int(params.get("page", 1))
+        page_size = int(params.get("page_size", 50))
+        score_ranges = {}
+        for column in scoring.SCORE_COLUMNS:
+            low, high = params.get(f"min_{column}"), params.get(f"max_{column}")
+            if low is not None or high is not None:
+                score_ranges[column] = (
+                    float(low) if low is not None else None, float(high) if high is not None else None
+                )
+    except ValueError:
+        raise ValueError("page, page_size and the score bounds must be numbers") from None
+    if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"page must be 1 or more and page_size 1 to {MAX_PAGE_SIZE}")
+    sort = params.get("sort", "created_at")
+    if sort not in db.SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(db.SORT_KEYS)}")
+    return {
+        "page": page,
+        "page_size": page_size,
+        "sort": sort,
+        "descending": payload.coerce("bool", params.get("descending", "true")),
+        "facilities": tuple(params.getlist("facility")),
+        "score_ranges": score_ranges,
+    }
+
+
+async def _read_json(request):
+    """Request body -> decoded JSON, or an error response."""
+    try:
+        return await request.json(), None
+    except ValueError as e:
+        return None, _bad_request(f"Invalid JSON: {e}")
+
+
+async def _read_proposal(request):
+    """Request body -> Proposal, or an error response."""
+    data, error = await _read_json(request)
+    if error:
+        return None, error
+    try:
+        return payload.parse(data), None
+    except ValueError as e:
+        return None, _bad_request(f"Invalid proposal: {e}")
+
+
+async def score_endpoint(request):
+    data, error = await _read_json(request)
+    if error:
+        return error
+    if isinstance(data, dict):
+        return JSONResponse(await run_in_threadpool(_score_one, request.app.state.db_path, data))
+    if not isinstance(data, list):
+        return _bad_request("Send a proposal object or an array of them.")
+    if len(data) > MAX_BATCH:
+        return _bad_request(f"At most {MAX_BATCH} proposals per request.", status_code=413)
+    if not all(isinstance(item, dict) for item in data):
+        return _bad_request("Invalid proposal: a proposal must be a JSON object")
+    if not data:
+        return JSONResponse({"results": []})
+    return JSONResponse({"results": await run_in_threadpool(_score_batch, request.app.state.db_path, data)})
+
+
+async def put_submission_endpoint(request):
+    proposal, error = await _read_proposal(request)
+    if error:
+        return error
+    proposal.submitter.facility_code = request.path_params["facility_code"].strip()
+    errors = payload.validation_errors(proposal)
+    if errors:
+        return JSONResponse({"errors": errors}, status_code=422)
+    await run_in_threadpool(_fill_hubs, request.app.state.db_path, proposal)
+    scores = rescore.rescore_payload(proposal, scoring.current_rubric())
+    await run_in_threadpool(_save, request.app.state.db_path, proposal)
+    return JSONResponse({"facility_code": proposal.submitter.facility_code, **scores})
+
+
+async def list_submissions_endpoint(request):
+    try:
+        query = _listing_query(request.query_params)
+    except ValueError as e:
+        return _bad_request(str(e))
+    total, items = await run_in_threadpool(_list_submissions, request.app.state.db_path, query)
+    return JSONResponse({"total": total, "page": query["page"], "page_size": query["page_size"], "items": items})
+
+
+async def version_endpoint(request):
+    return JSONResponse({"data_version": await run_in_threadpool(_data_version, request.app.state.db_path)})
+
+
+async def _refresh_snapshot(db_path, snapshot_path, interval):
+    written = None
+    while True:
+        try:
+            version = await run_in_threadpool(_data_version, db_path)
+            if version != written:
+                await run_in_threadpool(db.write_snapshot, db_path, snapshot_path)
+                written = version
+        except Exception:
+            # e.g. a full disk: readers keep the previous snapshot until a refresh succeeds.
+            log.exception("Refreshing snapshot %s failed; retrying in %gs", snapshot_path, interval)
+        await asyncio.sleep(interval)
+
+
+def create_app(db_path=db.DB_PATH, snapshot_path=None, snapshot_interval=SNAPSHOT_INTERVAL):
+    """The Starlette app; with ``snapshot_path`` it also keeps that snapshot fresh."""
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        await run_in_threadpool(db.migrate, db_path)
+        refresher = None
+        if snapshot_path:
+            await run_in_threadpool(db.write_snapshot, db_path, snapshot_path)
+            refresher = asyncio.create_task(_refresh_snapshot(db_path, snapshot_path, snapshot_interval))
+        try:
+            yield
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+
+    app = Starlette(
+        routes=[
+            Route("/score", score_endpoint, methods=["POST"]),
+            Route("/submissions", list_submissions_endpoint, methods=["GET"]),
+            Route("/submissions/{facility_code}", put_submission_endpoint, methods=["PUT"]),
+            Route("/version", version_endpoint, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.db_path = db_path
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve submissions.db over HTTP/JSON.")
+    parser.add_argument("--db", default=db.DB_PATH, help=f"database path (default: {db.DB_PATH})")
+    parser.add_argument("--snapshot", help="keep a read-only snapshot of the database at this path")
+    parser.add_argument(
+        "--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL,
+        help=f"seconds between snapshot refreshes (default: {SNAPSHOT_INTERVAL:g})",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    app = create_app(args.db, args.snapshot, args.snapshot_interval)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
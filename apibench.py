@@ -0,0 +1,169 @@
+"""Benchmark of the HTTP/JSON service (api.py): requests per second and latency.
+
+    python apibench.py --db big.db --clients 1 8 32 --duration 10
+    python apibench.py --db big.db --url http://127.0.0.1:8600 --endpoints score list
+
+Copies the ``--db`` database into a temporary directory and starts api.py
+on the copy (or, with ``--url``, targets a running service and leaves its
+data alone except for the submissions the ``put`` endpoint adds). The
+scoring and ``put`` requests send proposals taken from ``--db`` under new
+facility codes. For each endpoint and client count, that many concurrent
+clients each send requests back to back over a kept-alive connection for
+``--duration`` seconds. Prints requests per second and p50/p99 latency, and
+with ``--json`` also writes them to a file.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+import db
+import loadtest
+import payload
+
+ENDPOINTS = ("score", "score_batch", "list", "put")
+
+
+def _requests(endpoint, db_path, rows, batch_size, client):
+    """Endless (method, path, body) requests for one client of ``endpoint``."""
+    rng = random.Random(client)
+    if endpoint == "list":
+        pages = max(1, rows // 50)
+        while True:
+            query = {"page": rng.randint(1, pages), "sort": rng.choice(("total_score", "created_at"))}
+            yield "GET", f"/submissions?{urllib.parse.urlencode(query)}", None
+    proposals = loadtest.resubmissions(db_path, seed=client, prefix=f"APIBENCH-{client}-")
+    if endpoint == "score_batch":
+        batch = [payload_body(p) for p in itertools.islice(proposals, batch_size)]
+        body = json.dumps(batch).encode()
+        while True:
+            yield "POST", "/score", body
+    for p in proposals:
+        body = json.dumps(payload_body(p)).encode()
+        if endpoint == "score":
+            yield "POST", "/score", body
+        else:
+            yield "PUT", f"/submissions/{p.submitter.facility_code}", body
+
+
+def payload_body(proposal):
+    """A Proposal as a client would send it: the payload layout without the derived fields."""
+    return {
+        section: {field: value for field, value in fields.items() if field not in payload.DERIVED_FIELDS}
+        for section, fields in proposal.to_dict().items()
+    }
+
+
+def _client(url, requests, deadline, timings, errors):
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    try:
+        for method, path, body in requests:
+            began = time.perf_counter()
+            if began >= deadline:
+                break
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            timings.append(time.perf_counter() - began)
+            if response.status != 200:
+                errors.append(response.status)
+    finally:
+        conn.close()
+
+
+def run(url, endpoint, clients, duration, db_path, rows, batch_size):
+    """{"requests_per_s", "p50_ms", "p99_ms", "errors"} for ``clients`` concurrent clients."""
+    requests = []
+    for i in range(clients):
+        # Build each client's first request before the clock starts.
+        generator = _requests(endpoint, db_path, rows, batch_size, i)
+        requests.append(itertools.chain([next(generator)], generator))
+    timings = [[] for _ in range(clients)]
+    errors = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(url, requests[i], deadline, timings[i], errors))
+        for i in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    times = [t for client in timings for t in client]
+    return {
+        "requests_per_s": len(times) / duration,
+        "p50_ms": float(np.percentile(times, 50) * 1000) if times else None,
+        "p99_ms": float(np.percentile(times, 99) * 1000) if times else None,
+        "errors": len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Requests/sec and latency of the HTTP/JSON service.")
+    parser.add_argument("--url", help="benchmark a running service instead of starting one")
+    parser.add_argument("--db", required=True, help="submissions database to serve (a copy) and take proposals from")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32], help="concurrent client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run (default: 10)")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--batch-size", type=int, default=100, help="proposals per score_batch request (default: 100)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "submissions.db")
+        loadtest.copy_database(args.db, db_path)
+        conn = db.get_connection(db_path)
+        try:
+            rows = db.count_summaries(conn)
+        finally:
+            conn.close()
+        if not rows and set(args.endpoints) - {"list"}:
+            parser.error(f"{args.db} has no submissions to send")
+        server = None
+        url = args.url
+        if url is None:
+            port = loadtest.free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen([
+                sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py"),
+                "--db", db_path, "--port", str(port),
+            ])
+        try:
+            loadtest.wait_for(f"{url}/version")
+            report = []
+            for endpoint in args.endpoints:
+                for clients in args.clients:
+                    row = {"endpoint": endpoint, "clients": clients,
+                           **run(url, endpoint, clients, args.duration, db_path, rows, args.batch_size)}
+                    report.append(row)
+                    latency = (
+                        f"p50 {row['p50_ms']:.1f} / p99 {row['p99_ms']:.1f} ms" if row["p50_ms"] is not None else "-"
+                    )
+                    print(f"{endpoint:12} clients={clients:<3} {row['requests_per_s']:8.1f} req/s  {latency}"
+                          f"  errors={row['errors']}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"db": args.db, "rows": rows, "duration": args.duration, "batch_size": args.batch_size,
+                       "results": report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
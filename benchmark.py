@@ -0,0 +1,196 @@
+"""Benchmark suite for the scoring and database hot paths, with regression checks.
+
+    python benchmark.py --rows 1000 100000 -o bench.json
+    python benchmark.py --rows 1000 100000 1000000 --compare bench.json
+
+For each size, fills a temporary submissions.db with that many synthetic
+submissions (synthetic.py: seeded, spread around Indian cities) and times:
+
+    dashboard_load   what the dashboard reads on first load: facility codes, the
+                     first summary page, its count, and the facility location index
+    filter           a score-range and operations filter, counted and paged, and a top-sites ranking
+    export_csv       every latest submission through export.write
+    score_inputs     every latest payload decoded into a scoring frame
+    score_single     Rubric.score_proposal over SCORE_SAMPLE proposals
+    score_batch      scoring.score_frame over the whole scoring frame
+    upsert_single    one submission per transaction, as the Submit Proposal form saves
+    upsert_batch     UPSERT_BATCH submissions in one transaction, as bulk_score --db does
+
+Each benchmark runs ``--repeat`` times after a warm-up; the median and
+minimum are reported, with ``per_item_us`` where a run handles many items.
+``-o`` writes the results as JSON. ``--compare`` reads an earlier file and
+exits with status 1 if any median got slower by more than ``--threshold``.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import db
+import export
+import geo
+import payload
+import scoring
+import synthetic
+
+UPSERT_SINGLE = 200
+UPSERT_BATCH = 5000
+SCORE_SAMPLE = 1000
+THRESHOLD = 1.25
+# Facility codes of the rows the upsert benchmarks add, clear of the generated ones.
+_NEW_CODES = 10_000_000
+
+
+def _time(fn, repeat):
+    """Run ``fn`` once to warm up, then ``repeat`` times; returns the durations in seconds."""
+    fn()
+    durations = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - began)
+    return durations
+
+
+def _dashboard_load(conn):
+    db.facility_codes(conn)
+    db.count_summaries(conn)
+    rows, cols = db.summary_page(conn, limit=50)
+    pd.DataFrame(rows, columns=cols)
+    geo.GridIndex.from_rows(db.facility_locations(conn))
+
+
+def _filter(conn):
+    score_ranges = {"total_score": (40.0, None), "loc_score": (10.0, None)}
+    db.count_summaries(conn, score_ranges=score_ranges)
+    rows, cols = db.summary_page(conn, score_ranges=score_ranges, sort="total_score", limit=50)
+    pd.DataFrame(rows, columns=cols)
+    db.top_sites(conn, 20, min_scores={"total_score": 40.0}, operations=(scoring.OPERATIONS[0],))
+
+
+def _export_csv(conn):
+    with open(os.devnull, "wb") as out:
+        export.write("csv", db.matching_submissions(conn), out)
+
+
+def run_size(rows, repeat, workdir):
+    """{benchmark: result} for a database of ``rows`` synthetic submissions."""
+    db_path = os.path.join(workdir, f"bench_{rows}.db")
+    began = time.perf_counter()
+    synthetic.populate(db_path, rows, workers=os.cpu_count() or 1)
+    print(f"{rows:>9} rows generated in {time.perf_counter() - began:.1f}s", file=sys.stderr)
+
+    conn = db.get_connection(db_path)
+    try:
+        rules = scoring.current_rubric()
+        # Each upsert run writes new facilities, so every run pays for inserts rather than no-op updates.
+        new_rows = synthetic.proposals(UPSERT_SINGLE * (repeat + 1) + UPSERT_BATCH * (repeat + 1), seed=1,
+                                       start=_NEW_CODES)
+        singles = iter([next(new_rows) for _ in range(UPSERT_SINGLE * (repeat + 1))])
+        batches = iter([
+            [db.submission_record(next(new_rows)) for _ in range(UPSERT_BATCH)] for _ in range(repeat + 1)
+        ])
+        frame = payload.decode_frame(db.latest_payloads(conn))
+        sample = [payload.nest(row) for row in frame.head(SCORE_SAMPLE).to_dict("records")]
+
+        def upsert_single():
+            for _ in range(UPSERT_SINGLE):
+                db.save_submission(conn, next(singles))
+
+        benchmarks = {
+            "dashboard_load": (lambda: _dashboard_load(conn), None),
+            "filter": (lambda: _filter(conn), None),
+            "export_csv": (lambda: _export_csv(conn), rows),
+            "score_inputs": (lambda: payload.decode_frame(db.latest_payloads(conn)), rows),
+            "score_single": (lambda: [rules.score_proposal(p) for p in sample], len(sample)),
+            "score_batch": (lambda: scoring.score_frame(frame, rules), len(frame)),
+            # Last, so the reads above see exactly ``rows`` submissions.
+            "upsert_single": (upsert_single, UPSERT_SINGLE),
+            "upsert_batch": (lambda: db.upsert_submissions(conn, next(batches)), UPSERT_BATCH),
+        }
+        results = {}
+        for name, (fn, items) in benchmarks.items():
+            durations = _time(fn, repeat)
+            median = statistics.median(durations)
+            results[name] = {"median_s": median, "min_s": min(durations), "runs": len(durations)}
+            if items:
+                results[name]["per_item_us"] = median / items * 1e6
+            print(f"{rows:>9} {name:15} median {median * 1000:10.2f} ms  min {min(durations) * 1000:10.2f} ms",
+                  file=sys.stderr)
+        return results
+    finally:
+        conn.close()
+        os.remove(db_path)
+
+
+def environment():
+    """What the numbers depend on besides the code, stored alongside them."""
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "payload_encoding": payload.PAYLOAD_ENCODING,
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """[(rows, benchmark, baseline median, new median, ratio)] of the benchmarks slower than ``threshold``."""
+    regressions = []
+    for rows, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            before = baseline.get(rows, {}).get(name)
+            if before is None or before["median_s"] <= 0:
+                continue
+            ratio = result["median_s"] / before["median_s"]
+            print(f"{rows:>9} {name:15} {ratio:6.2f}x baseline", file=sys.stderr)
+            if ratio > threshold:
+                regressions.append((rows, name, before["median_s"], result["median_s"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the scoring and database hot paths on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000], help="database sizes to run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (default: 5)")
+    parser.add_argument("-o", "--output", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="earlier results to check for regressions")
+    parser.add_argument(
+        "--threshold", type=float, default=THRESHOLD,
+        help=f"slowdown ratio counted as a regression (default: {THRESHOLD})",
+    )
+    parser.add_argument("--tmpdir", help="where to build the databases (default: the system temp directory)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as workdir:
+        for rows in args.rows:
+            # JSON object keys are strings; use them here too so results and baselines compare alike.
+            results[str(rows)] = run_size(rows, args.repeat, workdir)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "repeat": args.repeat, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for rows, name, before, after, ratio in regressions:
+            print(f"REGRESSION {name} at {rows} rows: {before * 1000:.2f} -> {after * 1000:.2f} ms ({ratio:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
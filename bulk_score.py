@@ -0,0 +1,199 @@
+"""Score candidate facilities from a CSV or JSONL file without the Streamlit form.
+
+    python bulk_score.py broker_list.csv -o scored.csv
+    python bulk_score.py listings.jsonl -o scored.jsonl --db submissions.db
+
+Input columns are the payload field names (see
+``payload.PAYLOAD_SECTIONS``), e.g. facility_code, scenario, util,
+ops_selected, req_area. Multiselect fields take ';'-separated text in CSV.
+Missing airport_dist/highway_dist are looked up from latitude/longitude in
+the offline reference files (see reference.py). Where latitude/longitude
+are valid, hubs_radius is counted like the form counts it: the other
+facilities within 20 km, among those in the database (``--db``, or the
+app's database) when the run starts. The file is processed in fixed-size
+chunks, so memory stays flat however long the broker list is; each scored
+chunk is written out before the next is read. With ``--db`` every valid row
+is also upserted into submissions.db, one transaction per chunk.
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+import db
+import geo
+import payload
+import reference
+import scoring
+
+FORMATS = ("csv", "jsonl")
+
+# score_frame column -> payload field name
+_OUTPUT_NAMES = {column: field for field, column in payload.DERIVED_FIELDS.items()}
+
+
+def detect_format(path, default="csv"):
+    ext = os.path.splitext(path or "")[1].lower()
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if ext in (".csv", ".txt"):
+        return "csv"
+    return default
+
+
+def read_chunks(source, fmt, chunksize):
+    if fmt == "csv":
+        # Read everything as text so each chunk is typed the same way; payload.coerce_frame parses numbers.
+        return pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=[""])
+    return pd.read_json(source, lines=True, chunksize=chunksize, dtype=False, precise_float=True)
+
+
+def fill_distances(chunk):
+    """Fill missing airport_dist/highway_dist from latitude/longitude using the reference files."""
+    if "latitude" not in chunk.columns or "longitude" not in chunk.columns:
+        return chunk
+    missing = pd.Series(False, index=chunk.index)
+    for column in ("airport_dist", "highway_dist"):
+        missing |= chunk[column].isna() if column in chunk.columns else True
+    if not missing.any():
+        return chunk
+    found = reference.proximity_frame(chunk.loc[missing, "latitude"], chunk.loc[missing, "longitude"])
+    for column in found.columns:
+        if column in chunk.columns:
+            chunk[column] = chunk[column].fillna(found[column])
+        else:
+            chunk[column] = found[column]
+    return chunk
+
+
+def hub_index(conn):
+    """geo.GridIndex over the facility locations in the database, for ``count_hubs``."""
+    return geo.GridIndex.from_rows(db.facility_locations(conn))
+
+
+def count_hubs(index, latitude, longitude, facility_code=None):
+    """Facilities in ``index`` within geo.HUB_RADIUS_KM of the point, other than ``facility_code``.
+
+    None if the point is not a valid latitude/longitude. The form, bulk
+    scoring and the API all derive hubs_radius this way.
+    """
+    if not geo.valid_point(latitude, longitude):
+        return None
+    return index.count_within(latitude, longitude, exclude=facility_code)
+
+
+def fill_hubs(chunk, index):
+    """Set hubs_radius from latitude/longitude; rows without a valid point keep the value they came with."""
+    if "latitude" not in chunk.columns or "longitude" not in chunk.columns:
+        return chunk
+    codes = chunk["facility_code"] if "facility_code" in chunk.columns else pd.Series(None, index=chunk.index)
+    hubs = pd.Series([
+        count_hubs(index, lat, lon, None if pd.isna(code) else str(code))
+        for lat, lon, code in zip(chunk["latitude"].tolist(), chunk["longitude"].tolist(), codes.tolist())
+    ], index=chunk.index, dtype=float)
+    chunk["hubs_radius"] = hubs.fillna(chunk["hubs_radius"]) if "hubs_radius" in chunk.columns else hubs
+    return chunk
+
+
+def score_chunk(chunk, hubs=None):
+    """Input rows plus freshly computed derived fields and scores.
+
+    ``hubs`` (a ``hub_index``) sets hubs_radius from the coordinates.
+    """
+    chunk = fill_distances(payload.coerce_frame(chunk))
+    if hubs is not None:
+        chunk = fill_hubs(chunk, hubs)
+    scores = scoring.score_frame(chunk).rename(columns=_OUTPUT_NAMES)
+    chunk = chunk.drop(columns=[c for c in scores.columns if c in chunk.columns])
+    return pd.concat([chunk, scores], axis=1)
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_chunk(frame, out, fmt, header):
+    if fmt == "csv":
+        frame = frame.copy()
+        for column in frame.columns:
+            if payload.FIELD_KINDS.get(column) == "list":
+                frame[column] = frame[column].map(lambda v: ";".join(v) if isinstance(v, list) else v)
+        frame.to_csv(out, index=False, header=header, lineterminator="\n")
+    else:
+        # json.dumps keeps full float precision (DataFrame.to_json rounds to 10 digits).
+        records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        out.writelines(json.dumps(record, ensure_ascii=False, default=_json_default) + "\n" for record in records)
+    out.flush()
+
+
+def upsert_chunk(conn, scored):
+    """Upsert the valid rows of a scored chunk; returns (written, skipped)."""
+    records = []
+    skipped = 0
+    for row in scored.to_dict("records"):
+        p = payload.nest(row)
+        if payload.validation_errors(p):
+            skipped += 1
+            continue
+        records.append(db.submission_record(p))
+    return db.upsert_submissions(conn, records), skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score facility proposals from a CSV/JSONL file.")
+    parser.add_argument("input", help="CSV or JSONL file of proposals ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="where to write scored rows (default: stdout)")
+    parser.add_argument("--input-format", choices=FORMATS, help="defaults to the input file extension")
+    parser.add_argument("--output-format", choices=FORMATS, help="defaults to the output file extension")
+    parser.add_argument("--chunksize", type=int, default=5000, help="rows per chunk (default: 5000)")
+    parser.add_argument("--db", metavar="PATH", help="also upsert valid rows into this submissions database")
+    args = parser.parse_args(argv)
+
+    in_fmt = args.input_format or detect_format(args.input)
+    out_fmt = args.output_format or detect_format(args.output, default=in_fmt)
+    source = sys.stdin if args.input == "-" else args.input
+
+    conn = None
+    if args.db:
+        conn = db.get_connection(args.db)
+        db.init_db(conn)
+        hubs = hub_index(conn)
+    elif os.path.exists(db.READ_DB_PATH):
+        hubs_conn = db.get_connection(db.READ_DB_PATH, readonly=db.READ_DB_PATH != db.DB_PATH)
+        try:
+            hubs = hub_index(hubs_conn)
+        finally:
+            hubs_conn.close()
+    else:
+        hubs = geo.GridIndex()
+
+    scored_rows = written = skipped = 0
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        for i, chunk in enumerate(read_chunks(source, in_fmt, args.chunksize)):
+            scored = score_chunk(chunk, hubs)
+            write_chunk(scored, out, out_fmt, header=(i == 0))
+            scored_rows += len(scored)
+            if conn is not None:
+                w, s = upsert_chunk(conn, scored)
+                written += w
+                skipped += s
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if conn is not None:
+            conn.close()
+
+    summary = f"Scored {scored_rows} rows."
+    if args.db:
+        summary += f" Saved {written} submissions to {args.db}; skipped {skipped} rows missing compulsory fields."
+    print(summary, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
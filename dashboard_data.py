@@ -0,0 +1,180 @@
+"""Cached dashboard queries.
+
+Every widget interaction reruns the dashboard script. The loaders below are
+keyed on ``db.data_version``, a counter bumped by triggers whenever a
+submission is written, so reruns are served from memory and the queries
+only run again after a submission lands. The spatial index of facility
+locations is rebuilt the same way, so it always includes the latest
+submissions.
+"""
+import datetime
+import json
+
+import pandas as pd
+import streamlit as st
+
+import db
+import geo
+import payload
+import perf
+import scoring
+import sensitivity
+
+SORT_OPTIONS = {
+    "created_at": "Submitted",
+    "total_score": "Total score",
+    "need_score": "Need Identification",
+    "ops_score": "Operations/Network",
+    "loc_score": "Location Strategy",
+    "facility_score": "Facility Specs",
+    "facility_code": "Facility code",
+}
+
+# Columns the top-sites ranking can order by (highest first)
+RANK_OPTIONS = {column: SORT_OPTIONS[column] for column in ("total_score", *scoring.SCORE_COLUMNS[:-1])}
+
+# Category weight parameter -> label, for the sensitivity analysis
+WEIGHT_PARAMETERS = dict(zip(sensitivity.WEIGHTS, ("Need Identification", "Operations/Network",
+                                                   "Location Strategy", "Facility Specs")))
+
+# (column, label) for the score range sliders
+SCORE_FILTERS = (
+    ("total_score", "Total score"),
+    ("need_score", "Need Identification"),
+    ("ops_score", "Operations/Network"),
+    ("loc_score", "Location Strategy"),
+    ("facility_score", "Facility Specs"),
+)
+
+
+def score_filters():
+    """(column, label, maximum) per score slider, maxima from the current rubric."""
+    max_scores = scoring.current_rubric().max_scores
+    return [(column, label, max_scores[column]) for column, label in SCORE_FILTERS]
+
+
+def submitted_range(dates):
+    """st.date_input range -> ``(start, end)`` created_at bounds for db queries, or None.
+
+    Dates are whole UTC days (created_at is CURRENT_TIMESTAMP); the end day is included.
+    """
+    if len(dates) != 2:
+        return None
+    start, end = dates
+    return start.isoformat(), (end + datetime.timedelta(days=1)).isoformat()
+
+
+def _frame(rows, columns):
+    """Query result -> DataFrame, counted and timed for the performance panel."""
+    perf.count("rows", len(rows))
+    with perf.timed("dataframe"):
+        return pd.DataFrame(rows, columns=columns)
+
+
+def current_version(db_path=db.READ_DB_PATH):
+    with db.connection(db_path) as conn:
+        return db.data_version(conn)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def facility_codes(version, db_path=db.READ_DB_PATH):
+    with db.connection(db_path) as conn:
+        return db.facility_codes(conn)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def count_summaries(version, facilities=(), score_ranges=None, submitted=None, db_path=db.READ_DB_PATH):
+    with db.connection(db_path) as conn:
+        return db.count_summaries(conn, facilities, score_ranges, submitted)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def summary_page(version, facilities=(), score_ranges=None, submitted=None, sort="created_at", descending=True,
+                 page_size=50, page=1, db_path=db.READ_DB_PATH):
+    """One page (1-based) of the latest-per-facility summary table."""
+    with db.connection(db_path) as conn:
+        rows, cols = db.summary_page(
+            conn, facilities, score_ranges, submitted, sort, descending, limit=page_size, offset=(page - 1) * page_size
+        )
+    return _frame(rows, cols)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def hub_index(version, db_path=db.READ_DB_PATH):
+    """geo.GridIndex over every facility location (shared across sessions, read-only)."""
+    with db.connection(db_path) as conn:
+        return geo.GridIndex.from_rows(db.facility_locations(conn))
+
+
+def hubs_within(version, lat, lon, radius_km=geo.HUB_RADIUS_KM, exclude=None, db_path=db.READ_DB_PATH):
+    """[(facility_code, distance_km), ...] within ``radius_km`` of the point, nearest first."""
+    return hub_index(version, db_path).within(lat, lon, radius_km, exclude)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def nearby_facilities(version, lat, lon, radius_km, db_path=db.READ_DB_PATH):
+    """Summary rows of the facilities within ``radius_km``, with their distance, nearest first."""
+    found = hubs_within(version, lat, lon, radius_km, db_path=db_path)
+    distances = pd.DataFrame(found, columns=["facility_code", "distance_km"])
+    if not found:
+        return distances
+    with db.connection(db_path) as conn:
+        rows, cols = db.summary_page(conn, tuple(distances["facility_code"]), limit=len(found))
+    return distances.merge(_frame(rows, cols), on="facility_code")
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def top_sites(version, k=20, lat=None, lon=None, radius_km=geo.HUB_RADIUS_KM, min_scores=None, operations=(),
+              sort="total_score", db_path=db.READ_DB_PATH):
+    """The ``k`` best facilities by ``sort``; given a point, only those within ``radius_km`` of it.
+
+    The radius is answered by the facility location index, the thresholds,
+    operation types, ordering and limit by SQL; ``distance_km`` is filled in
+    when a point is given.
+    """
+    facilities = ()
+    distances = {}
+    if lat is not None and lon is not None:
+        distances = dict(hubs_within(version, lat, lon, radius_km, db_path=db_path))
+        if not distances:
+            return pd.DataFrame(columns=["distance_km", *db.TOP_SITE_COLUMNS])
+        facilities = tuple(distances)
+    with db.connection(db_path) as conn:
+        rows, cols = db.top_sites(conn, k, facilities, min_scores, operations, sort)
+    df = _frame(rows, cols)
+    df["operations"] = df["operations"].map(lambda ops: "; ".join(json.loads(ops)) if ops else "")
+    if distances:
+        df.insert(0, "distance_km", df["facility_code"].map(distances))
+    return df
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def scoring_inputs(version, db_path=db.READ_DB_PATH):
+    """Every facility's latest proposal as one row of payload fields (see ``payload.flatten``), by code."""
+    with db.connection(db_path) as conn:
+        stored = db.latest_payloads(conn).fetchall()
+    return payload.decode_frame(stored)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def sensitivity_analysis(version, rubric_config, scenarios, top_k=20, db_path=db.READ_DB_PATH):
+    """``sensitivity.analyze`` of every facility's latest proposal under the given rubric config."""
+    return sensitivity.analyze(scoring_inputs(version, db_path), scenarios, scoring.Rubric(rubric_config), top_k)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def facility_history(version, facility_code, db_path=db.READ_DB_PATH):
+    """All recorded versions of one facility, newest first."""
+    with db.connection(db_path) as conn:
+        rows, cols = db.facility_history(conn, facility_code)
+    return _frame(rows, cols)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def version_diff(version, facility_code, old_version, new_version, db_path=db.READ_DB_PATH):
+    """Payload fields that changed between two versions of a facility."""
+    with db.connection(db_path) as conn:
+        stored = db.facility_version_payloads(conn, facility_code, (old_version, new_version))
+    with perf.timed("decode"):
+        old, new = (payload.decode(stored.get(v)) for v in (old_version, new_version))
+    return pd.DataFrame(payload.diff(old, new), columns=["field", f"v{old_version}", f"v{new_version}"]).astype(str)
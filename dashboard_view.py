@@ -0,0 +1,244 @@
+"""Facility Scoring Dashboard, shared by dashboard.py and main_app.py.
+
+Filters and pages the submissions table, downloads the selected
+submissions' inputs, and adds the nearby-facilities query, the top-sites
+ranking, the weight sensitivity analysis and each facility's version
+history. The queries go through dashboard_data, cached per data version.
+"""
+import functools
+
+import numpy as np
+import streamlit as st
+
+import dashboard_data
+import export
+import geo
+import perf
+import scoring
+import sensitivity
+
+
+def render():
+    """The dashboard below the page title."""
+    # Cached per data version; reruns without new submissions skip the queries
+    data_version = dashboard_data.current_version()
+
+    # Load distinct facility codes for filter options
+    facility_options = dashboard_data.facility_codes(data_version)
+
+    # Multi-select filter (empty -> show all)
+    selected_facilities = st.multiselect("Filter by Facility Code(s)", options=facility_options)
+
+    # Submission date range (UTC days; empty -> any date)
+    submitted_dates = st.date_input("Submitted between", value=(), format="YYYY-MM-DD")
+
+    # Score range filters (a slider left at its full range does not filter)
+    score_ranges = {}
+    with st.expander("Filter by score"):
+        for column, label, max_score in dashboard_data.score_filters():
+            low, high = st.slider(label, 0.0, float(max_score), (0.0, float(max_score)), step=0.5)
+            if (low, high) != (0.0, float(max_score)):
+                score_ranges[column] = (low, high)
+
+    # Sort order and paging
+    col_sort, col_order, col_size = st.columns(3)
+    with col_sort:
+        sort_by = st.selectbox("Sort by", list(dashboard_data.SORT_OPTIONS), format_func=dashboard_data.SORT_OPTIONS.get)
+    with col_order:
+        descending = st.radio("Order", ("Descending", "Ascending"), horizontal=True) == "Descending"
+    with col_size:
+        page_size = st.selectbox("Rows per page", (25, 50, 100, 250), index=1)
+
+    filter_args = (tuple(selected_facilities), score_ranges, dashboard_data.submitted_range(submitted_dates))
+    total_rows = dashboard_data.count_summaries(data_version, *filter_args)
+    page_count = max(1, -(-total_rows // page_size))
+    page_number = int(st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1))
+
+    # Fetch only the visible page of the summary table: basic details + category scores + total
+    summary_df = dashboard_data.summary_page(data_version, *filter_args, sort_by, descending, page_size, page_number)
+
+    st.subheader("Submissions")
+    if total_rows:
+        first_row = (page_number - 1) * page_size + 1
+        st.caption(f"Showing {first_row}-{first_row + len(summary_df) - 1} of {total_rows} facilities")
+    # Add in-table checkbox for selection
+    selected_ids = []
+    if not summary_df.empty:
+        table_df = summary_df.copy()
+        table_df.insert(0, "select", False)
+        with perf.timed("data_editor"):
+            edited_df = st.data_editor(
+                table_df,
+                hide_index=True,
+                width="stretch",
+                column_config={
+                    "select": st.column_config.CheckboxColumn("Select", default=False),
+                },
+                key=f"submissions_table_editor_{page_number}",
+            )
+        try:
+            selected_ids = [int(x) for x in edited_df[edited_df["select"] == True]["id"].tolist()]
+        except Exception:
+            selected_ids = []
+    else:
+        st.info("No submissions found.")
+
+    # Selection for download
+    st.markdown("")
+    st.subheader("Download Selected Submissions' Inputs")
+    if not summary_df.empty:
+        export_format = st.radio(
+            "File format", list(export.FORMATS), format_func=lambda f: export.FORMATS[f][0], horizontal=True
+        )
+        _, extension, mime = export.FORMATS[export_format]
+        # Streamed from the database only when the button is clicked.
+        # If no rows selected, export all filtered rows (every page).
+        st.download_button(
+            label="Download",
+            data=functools.partial(export.export_bytes, export_format, selected_ids, *filter_args, sort_by, descending),
+            file_name=f"facility_submissions_inputs.{extension}",
+            mime=mime,
+        )
+    else:
+        st.info("No submissions found.")
+
+    _nearby_facilities(data_version)
+    _top_sites(data_version)
+    _weight_sensitivity(data_version)
+    _facility_history(data_version, facility_options)
+
+
+def _nearby_facilities(data_version):
+    """Radius query over the facility locations (same index as the hubs count on the form)."""
+    st.markdown("")
+    st.subheader("Facilities Near a Location")
+    col_lat, col_lon, col_radius = st.columns(3)
+    with col_lat:
+        near_lat = st.number_input("Latitude", min_value=-90.0, max_value=90.0, value=None, format="%.6f", placeholder="e.g., 28.6139")
+    with col_lon:
+        near_lon = st.number_input("Longitude", min_value=-180.0, max_value=180.0, value=None, format="%.6f", placeholder="e.g., 77.2090")
+    with col_radius:
+        near_radius = st.number_input("Radius (km)", min_value=1.0, max_value=500.0, value=geo.HUB_RADIUS_KM, step=5.0)
+    if near_lat is not None and near_lon is not None:
+        nearby_df = dashboard_data.nearby_facilities(data_version, near_lat, near_lon, near_radius)
+        if nearby_df.empty:
+            st.info(f"No facilities within {near_radius:g} km.")
+        else:
+            st.dataframe(nearby_df.round({"distance_km": 2}), width="stretch", hide_index=True)
+
+
+def _top_sites(data_version):
+    """Top-K ranking: best sites, optionally near a point, above per-category thresholds."""
+    st.markdown("")
+    st.subheader("Top Sites")
+    col_k, col_rank, col_ops = st.columns(3)
+    with col_k:
+        top_k = int(st.number_input("Number of sites", min_value=1, max_value=500, value=20, step=5))
+    with col_rank:
+        rank_by = st.selectbox("Rank by", list(dashboard_data.RANK_OPTIONS), format_func=dashboard_data.RANK_OPTIONS.get)
+    with col_ops:
+        top_operations = st.multiselect("Required operations", scoring.OPERATIONS)
+    col_lat, col_lon, col_radius = st.columns(3)
+    with col_lat:
+        top_lat = st.number_input(
+            "Latitude", min_value=-90.0, max_value=90.0, value=None, format="%.6f", placeholder="any", key="top_sites_lat"
+        )
+    with col_lon:
+        top_lon = st.number_input(
+            "Longitude", min_value=-180.0, max_value=180.0, value=None, format="%.6f", placeholder="any", key="top_sites_lon"
+        )
+    with col_radius:
+        top_radius = st.number_input("Radius (km)", min_value=1.0, max_value=500.0, value=50.0, step=5.0, key="top_sites_radius")
+    min_scores = {}
+    with st.expander("Minimum scores"):
+        for column, label, max_score in dashboard_data.score_filters():
+            threshold = st.slider(label, 0.0, float(max_score), 0.0, step=0.5, key=f"top_sites_min_{column}")
+            if threshold > 0:
+                min_scores[column] = threshold
+    top_df = dashboard_data.top_sites(
+        data_version, top_k, top_lat, top_lon, top_radius,
+        min_scores, tuple(top_operations), rank_by,
+    )
+    if top_df.empty:
+        st.info("No facilities match.")
+    else:
+        st.dataframe(top_df.round({"distance_km": 2}), width="stretch", hide_index=True)
+
+
+def _weight_sensitivity(data_version):
+    """What-if analysis: rankings under other category weights and thresholds."""
+    st.markdown("")
+    st.subheader("Weight Sensitivity")
+    with st.expander("Re-rank every facility under a range of rubric weights and thresholds"):
+        rubric = scoring.current_rubric()
+        base_parameters = sensitivity.parameters(rubric)
+        ranges = {}
+        for parameter, label in dashboard_data.WEIGHT_PARAMETERS.items():
+            value = float(base_parameters[parameter])
+            low, high = st.slider(f"{label} weight", 0.0, max(100.0, 2 * value), (value, value), step=1.0)
+            if low != high:
+                ranges[parameter] = (low, high)
+        varied_thresholds = st.multiselect(
+            "Also vary thresholds", [p for p in base_parameters if p.startswith(("ops.", "facility."))]
+        )
+        spread = st.slider("Threshold variation (±%)", 5, 50, 20, step=5)
+        for parameter in varied_thresholds:
+            value = float(base_parameters[parameter])
+            ranges[parameter] = (value * (1 - spread / 100), value * (1 + spread / 100))
+        col_mode, col_count, col_top = st.columns(3)
+        with col_mode:
+            mode = st.radio("Scenarios", ("Grid", "Monte Carlo"), horizontal=True)
+        with col_count:
+            if mode == "Grid":
+                steps = int(st.number_input("Values per parameter", min_value=2, max_value=20, value=5))
+            else:
+                samples = int(st.number_input("Number of scenarios", min_value=10, max_value=10000, value=1000, step=100))
+        with col_top:
+            sensitivity_top_k = int(st.number_input("Top K", min_value=1, max_value=500, value=20, step=5))
+        if not ranges:
+            st.info("Widen a weight range or pick a threshold to vary.")
+        else:
+            if mode == "Grid":
+                scenarios = sensitivity.grid({p: np.linspace(low, high, steps) for p, (low, high) in ranges.items()})
+            else:
+                scenarios = sensitivity.monte_carlo(ranges, samples)
+            if len(scenarios) > sensitivity.MAX_SCENARIOS:
+                st.warning(f"{len(scenarios)} scenarios; use fewer values per parameter (at most {sensitivity.MAX_SCENARIOS}).")
+            else:
+                facilities_df, scenarios_df = dashboard_data.sensitivity_analysis(
+                    data_version, rubric.config, scenarios, sensitivity_top_k
+                )
+                flipped = facilities_df[facilities_df["flips"] > 0]
+                st.caption(
+                    f"{len(scenarios_df)} scenarios over {len(facilities_df)} facilities. "
+                    f"Mean rank correlation with the current rubric: {scenarios_df['spearman'].mean():.3f}; "
+                    f"{len(flipped)} facilities move in or out of the top {sensitivity_top_k}."
+                )
+                st.dataframe(
+                    flipped.sort_values(["flips", "base_rank"], ascending=[False, True]).round(3),
+                    width="stretch", hide_index=True,
+                )
+                st.caption("Scenarios that change the ranking most")
+                st.dataframe(scenarios_df.nsmallest(20, "spearman").round(3), width="stretch", hide_index=True)
+
+
+def _facility_history(data_version, facility_options):
+    """Version history of one facility (every submission is kept)."""
+    st.markdown("")
+    st.subheader("Facility History")
+    history_code = st.selectbox("Facility code", facility_options, index=None, placeholder="Choose a facility")
+    if history_code:
+        history_df = dashboard_data.facility_history(data_version, history_code)
+        st.dataframe(history_df, width="stretch", hide_index=True)
+        versions = history_df["version"].tolist()
+        if len(versions) > 1:
+            col_old, col_new = st.columns(2)
+            with col_old:
+                old_version = st.selectbox("Compare version", versions, index=1)
+            with col_new:
+                new_version = st.selectbox("with version", versions, index=0)
+            diff_df = dashboard_data.version_diff(data_version, history_code, old_version, new_version)
+            if diff_df.empty:
+                st.info("No differences between these versions.")
+            else:
+                st.dataframe(diff_df, width="stretch", hide_index=True)
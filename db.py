@@ -0,0 +1,849 @@
+"""SQLite access for submissions.db shared by the app scripts and tools.
+
+Connections are opened once per process and reused through a small pool
+(``connection()``), so Streamlit reruns and submits no longer pay for a new
+``sqlite3.connect`` each time and keep their prepared-statement cache warm.
+The database runs in WAL mode: dashboard reads proceed while a submission
+is being written, and writers wait on ``busy_timeout`` instead of failing
+with "database is locked".
+
+In the multi-process deployment (see api.py) one process owns the database
+and every other process reads ``READ_DB_PATH``, a read-only snapshot the
+owner refreshes with ``write_snapshot``; pooled connections to a snapshot
+reopen by themselves when it is replaced.
+"""
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+import payload
+import perf
+
+DB_PATH = "submissions.db"
+# Where dashboards and exports read from: a snapshot of DB_PATH when
+# $FACILITY_READ_DB is set, otherwise the database itself.
+READ_DB_PATH = os.environ.get("FACILITY_READ_DB") or DB_PATH
+
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # WAL + NORMAL only syncs at checkpoints; a power cut can lose the last
+    # commits but never corrupts the database.
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+# --- SQL ---
+# Statements are module constants so each pooled connection's statement
+# cache sees the same text and reuses the prepared statement.
+
+SQL_UPSERT = """
+    INSERT INTO submissions (
+        facility_code, employee_id, latitude, longitude, drive_link,
+        need_score, ops_score, loc_score, facility_score, total_score, operations, payload
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(facility_code) DO UPDATE SET
+        employee_id = excluded.employee_id,
+        latitude = excluded.latitude,
+        longitude = excluded.longitude,
+        drive_link = excluded.drive_link,
+        need_score = excluded.need_score,
+        ops_score = excluded.ops_score,
+        loc_score = excluded.loc_score,
+        facility_score = excluded.facility_score,
+        total_score = excluded.total_score,
+        operations = excluded.operations,
+        payload = excluded.payload,
+        created_at = CURRENT_TIMESTAMP
+"""
+SQL_FACILITY_CODES = (
+    "SELECT facility_code FROM submissions WHERE facility_code IS NOT NULL AND facility_code != '' ORDER BY facility_code"
+)
+SQL_FACILITY_LOCATIONS = (
+    "SELECT facility_code, latitude, longitude FROM submissions "
+    "WHERE facility_code IS NOT NULL AND facility_code != '' "
+    "AND latitude IS NOT NULL AND longitude IS NOT NULL"
+)
+SQL_LATEST_PAYLOADS = (
+    "SELECT facility_code, payload FROM submissions "
+    "WHERE facility_code IS NOT NULL AND facility_code != '' ORDER BY facility_code"
+)
+SQL_FACILITY_HISTORY = (
+    "SELECT version, recorded_at, created_at, employee_id, latitude, longitude, drive_link, "
+    "need_score, ops_score, loc_score, facility_score, total_score "
+    "FROM submission_versions WHERE facility_code = ? ORDER BY version DESC"
+)
+# facility_code is unique, so the latest submission per facility is simply
+# its row; legacy rows without a code collapse to the most recent one.
+LATEST_PER_FACILITY = """
+    (facility_code IS NOT NULL OR id = (
+        SELECT id FROM submissions WHERE facility_code IS NULL
+        ORDER BY created_at DESC, id DESC LIMIT 1
+    ))
+"""
+SUMMARY_COLUMNS = (
+    "id", "facility_code", "employee_id", "latitude", "longitude", "created_at",
+    "need_score", "ops_score", "loc_score", "facility_score", "total_score",
+)
+EXPORT_COLUMNS = (
+    "id", "facility_code", "employee_id", "latitude", "longitude", "drive_link",
+    "total_score", "created_at", "payload",
+)
+# Sort keys accepted by the listing queries -> SQL expression. Each has a
+# supporting index so ORDER BY ... LIMIT walks the index instead of sorting.
+SORT_KEYS = {
+    "created_at": "created_at",
+    "facility_code": "facility_code",
+    "total_score": "total_score",
+    "need_score": "need_score",
+    "ops_score": "ops_score",
+    "loc_score": "loc_score",
+    "facility_score": "facility_score",
+}
+TOP_SITE_COLUMNS = SUMMARY_COLUMNS + ("operations",)
+SQL_SUBMISSIONS_BY_IDS = f"""
+    SELECT {', '.join(EXPORT_COLUMNS)}
+    FROM submissions
+    WHERE id IN (SELECT value FROM json_each(?))
+    ORDER BY created_at DESC, id DESC
+"""
+
+
+# --- Connections ---
+
+def get_connection(db_path=DB_PATH, readonly=False):
+    """Open a new tuned connection (autocommit; use ``transaction`` for writes).
+
+    ``readonly`` opens a snapshot from ``write_snapshot``: the file is never
+    modified in place, so SQLite can skip locking entirely.
+    """
+    if readonly:
+        return sqlite3.connect(
+            f"file:{os.path.abspath(db_path)}?mode=ro&immutable=1",
+            uri=True,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+        )
+    conn = sqlite3.connect(
+        db_path,
+        check_same_thread=False,
+        isolation_level=None,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=256,
+    )
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Fixed-size pool of connections to one database file.
+
+    Connections are created lazily up to ``size``; when all are checked out,
+    ``acquire`` waits for one to be released. A ``readonly`` pool serves a
+    snapshot file: when the file is replaced, idle connections are closed
+    and busy ones are closed on release, so readers move to the new copy.
+    """
+
+    def __init__(self, db_path=DB_PATH, size=POOL_SIZE, readonly=False):
+        self.db_path = db_path
+        self.size = size
+        self.readonly = readonly
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._file_id = self._current_file_id()
+        # Snapshot generation each open connection was made for (id(conn) -> generation).
+        self._generation = 0
+        self._opened = {}
+
+    def _current_file_id(self):
+        if not self.readonly:
+            return None
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _check_replaced(self):
+        file_id = self._current_file_id()
+        if file_id == self._file_id:
+            return
+        with self._lock:
+            if file_id == self._file_id:
+                return
+            self._file_id = file_id
+            self._generation += 1
+            while True:
+                try:
+                    self._discard(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+
+    def _discard(self, conn):
+        conn.close()
+        self._opened.pop(id(conn), None)
+        self._created -= 1
+
+    def acquire(self, timeout=BUSY_TIMEOUT_MS / 1000):
+        if self.readonly:
+            self._check_replaced()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    conn = get_connection(self.db_path, self.readonly)
+                except Exception:
+                    self._created -= 1
+                    raise
+                self._opened[id(conn)] = self._generation
+                return conn
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"no free connection to {self.db_path} after {timeout}s") from None
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self.readonly and self._opened.get(id(conn)) != self._generation:
+            # Checked out before the snapshot was replaced; it still reads the old file.
+            with self._lock:
+                self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._discard(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH):
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            readonly = db_path == READ_DB_PATH != DB_PATH
+            pool = _pools[db_path] = ConnectionPool(db_path, readonly=readonly)
+        return pool
+
+
+@contextlib.contextmanager
+def connection(db_path=DB_PATH):
+    """Borrow a pooled connection: ``with db.connection() as conn: ...``.
+
+    During a perf recording the time it is held counts as ``sql`` and its
+    statements as ``queries``.
+    """
+    recorder = perf.current()
+    with get_pool(db_path).connection() as conn:
+        if recorder is None:
+            yield conn
+            return
+        conn.set_trace_callback(recorder.count_query)
+        try:
+            with perf.timed("sql"):
+                yield conn
+        finally:
+            conn.set_trace_callback(None)
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """Write transaction that takes the write lock up front.
+
+    BEGIN IMMEDIATE makes a writer wait (up to busy_timeout) for the lock at
+    the start instead of failing when a read-then-write transaction tries to
+    upgrade its lock.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def write_snapshot(db_path=DB_PATH, snapshot_path=READ_DB_PATH):
+    """Copy the database to ``snapshot_path`` for read-only workers, replacing it atomically.
+
+    The copy is written next to the target and renamed over it, so readers
+    see either the old snapshot or the new one, never a partial file.
+    """
+    tmp_path = f"{snapshot_path}.tmp"
+    try:
+        with connection(db_path) as conn:
+            dest = sqlite3.connect(tmp_path)
+            try:
+                conn.backup(dest)
+                # Readers open the snapshot immutable; it needs no WAL files.
+                dest.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                dest.close()
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+# --- Schema ---
+
+def _create_submissions(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            facility_code TEXT,
+            employee_id TEXT NOT NULL,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            drive_link TEXT,
+            total_score REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            payload TEXT
+        )
+        """
+    )
+    # Tables created by early versions of the app lack these columns.
+    existing = {r[0] for r in conn.execute("SELECT name FROM pragma_table_info('submissions')")}
+    for column in ("payload", "facility_code"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE submissions ADD COLUMN {column} TEXT")
+
+
+UNIQUE_FACILITY_INDEX = "ux_submissions_facility_code"
+
+
+def _ensure_unique_facility_code(conn):
+    """One-time migration: make facility_code a unique key for the upsert.
+
+    Databases written before the key existed may hold several rows per code.
+    The latest one stays; older ones are moved to ``submissions_superseded``
+    so no proposal is lost.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (UNIQUE_FACILITY_INDEX,)).fetchone():
+        return
+    conn.execute("CREATE TABLE IF NOT EXISTS submissions_superseded AS SELECT * FROM submissions WHERE 0")
+    conn.execute(
+        """
+        CREATE TEMP TABLE superseded_ids AS
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY facility_code ORDER BY datetime(created_at) DESC, id DESC) AS rn
+            FROM submissions
+            WHERE facility_code IS NOT NULL
+        )
+        WHERE rn > 1
+        """
+    )
+    conn.execute("INSERT INTO submissions_superseded SELECT * FROM submissions WHERE id IN (SELECT id FROM temp.superseded_ids)")
+    conn.execute("DELETE FROM submissions WHERE id IN (SELECT id FROM temp.superseded_ids)")
+    conn.execute("DROP TABLE temp.superseded_ids")
+    conn.execute(f"CREATE UNIQUE INDEX {UNIQUE_FACILITY_INDEX} ON submissions(facility_code)")
+
+
+# Category scores kept as columns next to the payload, so the dashboard can
+# read and filter them without decoding JSON.
+SCORE_COLUMNS = ("need_score", "ops_score", "loc_score", "facility_score")
+_SCORE_PATHS = {
+    "need_score": "$.need_identification.need_score",
+    "ops_score": "$.operations_network.ops_score",
+    "loc_score": "$.location_strategy.loc_score",
+    "facility_score": "$.facility_specs.facility_score",
+}
+
+
+def _ensure_score_columns(conn):
+    """One-time migration: add indexed score columns and backfill them from payloads."""
+    existing = {r[0] for r in conn.execute("SELECT name FROM pragma_table_info('submissions')")}
+    if "facility_score" in existing:
+        return
+    for column in SCORE_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE submissions ADD COLUMN {column} REAL")
+    assignments = ", ".join(f"{column} = json_extract(payload, '{path}')" for column, path in _SCORE_PATHS.items())
+    conn.execute(f"UPDATE submissions SET {assignments} WHERE json_valid(payload)")
+    for column in SCORE_COLUMNS + ("total_score",):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS ix_submissions_{column} ON submissions({column})")
+
+
+def _ensure_data_version(conn):
+    """One-time migration: a counter bumped by triggers on every change to submissions.
+
+    Unlike ``PRAGMA data_version`` (which is per connection), the counter is
+    the same for every connection and process, so it can key caches.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'submissions_version_delete'").fetchone():
+        return
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS submissions_version_{event.lower()} AFTER {event} ON submissions
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE id = 1;
+            END
+            """
+        )
+
+
+# Append-only history: every write to a submissions row is also recorded
+# here as the next numbered version of that row.
+HISTORY_COLUMNS = (
+    "facility_code", "employee_id", "latitude", "longitude", "drive_link",
+    "need_score", "ops_score", "loc_score", "facility_score", "total_score", "payload", "created_at",
+)
+
+
+def _history_trigger(event):
+    new_values = ", ".join(f"NEW.{c}" for c in HISTORY_COLUMNS)
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS submissions_history_{event.lower()} AFTER {event} ON submissions
+        BEGIN
+            INSERT INTO submission_versions (submission_id, version, {', '.join(HISTORY_COLUMNS)})
+            VALUES (
+                NEW.id,
+                (SELECT coalesce(max(version), 0) + 1 FROM submission_versions WHERE submission_id = NEW.id),
+                {new_values}
+            );
+        END
+    """
+
+
+def _ensure_history(conn):
+    """One-time migration: the append-only ``submission_versions`` table and its triggers.
+
+    ``submissions`` stays the current row per facility (an indexed lookup on
+    facility_code); the triggers append each insert or update to the history
+    in the same transaction. Existing rows, and the older duplicates moved to
+    ``submissions_superseded`` by the unique-key migration, are backfilled as
+    the earlier versions.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'submissions_history_update'").fetchone():
+        return
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS submission_versions (
+            id INTEGER PRIMARY KEY,
+            submission_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            facility_code TEXT,
+            employee_id TEXT,
+            latitude REAL,
+            longitude REAL,
+            drive_link TEXT,
+            need_score REAL,
+            ops_score REAL,
+            loc_score REAL,
+            facility_score REAL,
+            total_score REAL,
+            payload TEXT,
+            created_at TIMESTAMP,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_submission_versions ON submission_versions(submission_id, version)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_submission_versions_facility ON submission_versions(facility_code, version)")
+    columns = ", ".join(HISTORY_COLUMNS)
+    superseded_scores = ", ".join(
+        f"CASE WHEN json_valid(o.payload) THEN json_extract(o.payload, '{path}') END AS {column}"
+        for column, path in _SCORE_PATHS.items()
+    )
+    conn.execute(
+        f"""
+        INSERT INTO submission_versions (submission_id, version, {columns}, recorded_at)
+        SELECT submission_id,
+               ROW_NUMBER() OVER (PARTITION BY submission_id ORDER BY is_current, datetime(created_at), row_id),
+               {columns}, created_at
+        FROM (
+            SELECT s.id AS submission_id, 0 AS is_current, o.id AS row_id,
+                   o.facility_code, o.employee_id, o.latitude, o.longitude, o.drive_link,
+                   {superseded_scores}, o.total_score, o.payload, o.created_at
+            FROM submissions_superseded o JOIN submissions s ON s.facility_code = o.facility_code
+            UNION ALL
+            SELECT id, 1, id, {columns} FROM submissions
+        )
+        """
+    )
+    for event in ("INSERT", "UPDATE"):
+        conn.execute(_history_trigger(event))
+
+
+CREATED_INDEX = "ix_submissions_facility_created"
+_NORMALIZE_TIMESTAMP = (
+    "UPDATE {table} SET {column} = datetime({column}) "
+    "WHERE datetime({column}) IS NOT NULL AND {column} IS NOT datetime({column})"
+)
+
+
+def _ensure_sortable_created_at(conn):
+    """One-time migration: store created_at as sortable text and index it.
+
+    CURRENT_TIMESTAMP writes ``YYYY-MM-DD HH:MM:SS``, which sorts correctly
+    as plain text; older rows in any other format SQLite understands are
+    rewritten to it, so queries can order and range-filter on the bare
+    column (and its indexes) instead of on ``datetime(created_at)``. The
+    history's ``recorded_at``, backfilled from ``created_at``, is rewritten
+    the same way.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (CREATED_INDEX,)).fetchone():
+        return
+    # Normalising a timestamp is not a new version of the submission.
+    conn.execute("DROP TRIGGER IF EXISTS submissions_history_update")
+    conn.execute(_NORMALIZE_TIMESTAMP.format(table="submissions", column="created_at"))
+    conn.execute(_history_trigger("UPDATE"))
+    conn.execute(_NORMALIZE_TIMESTAMP.format(table="submission_versions", column="created_at"))
+    conn.execute(_NORMALIZE_TIMESTAMP.format(table="submission_versions", column="recorded_at"))
+    conn.execute("DROP INDEX IF EXISTS ix_submissions_created")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_submissions_created_at ON submissions(created_at, id)")
+    conn.execute(f"CREATE INDEX {CREATED_INDEX} ON submissions(facility_code, created_at, id)")
+
+
+def _operations_json(ops_selected):
+    return json.dumps(list(ops_selected or []))
+
+
+def _ensure_operations_column(conn):
+    """One-time migration: the selected operations as a JSON array column, backfilled from payloads.
+
+    The payload may be compressed (see ``payload.decode``), so SQL cannot
+    read ``ops_selected`` out of it; the column lets listings filter on
+    operation types without decoding every row.
+    """
+    existing = {r[0] for r in conn.execute("SELECT name FROM pragma_table_info('submissions')")}
+    if "operations" in existing:
+        return
+    conn.execute("ALTER TABLE submissions ADD COLUMN operations TEXT")
+    updates = []
+    for row_id, stored in conn.execute("SELECT id, payload FROM submissions WHERE payload IS NOT NULL").fetchall():
+        proposal = payload.decode(stored)
+        if proposal is not None:
+            updates.append((_operations_json(proposal.operations_network.ops_selected), row_id))
+    # Filling in a derived column is not a new version of the submission.
+    conn.execute("DROP TRIGGER IF EXISTS submissions_history_update")
+    conn.executemany("UPDATE submissions SET operations = ? WHERE id = ?", updates)
+    conn.execute(_history_trigger("UPDATE"))
+
+
+def _create_rescore_checkpoints(conn):
+    """Progress of rescore.py per rubric, so an interrupted run resumes."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS rescore_checkpoints ("
+        "rubric TEXT PRIMARY KEY, last_id INTEGER NOT NULL, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+
+
+def _normalize_recorded_at(conn):
+    """One-time migration: ``recorded_at`` of history backfilled before it was normalised with created_at."""
+    conn.execute(_NORMALIZE_TIMESTAMP.format(table="submission_versions", column="recorded_at"))
+
+
+# Migrations in order. PRAGMA user_version records how many have been
+# applied, so on a current database init_db only reads that pragma. Each step
+# also checks for its own changes, because databases created before the
+# version was recorded start at 0 with some steps already done.
+MIGRATIONS = (
+    _create_submissions,
+    _ensure_unique_facility_code,
+    _ensure_score_columns,
+    _ensure_data_version,
+    _ensure_history,
+    _ensure_sortable_created_at,
+    _ensure_operations_column,
+    _create_rescore_checkpoints,
+    _normalize_recorded_at,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def init_db(conn):
+    """Apply pending migrations, each in its own transaction with its version bump."""
+    while schema_version(conn) < SCHEMA_VERSION:
+        with transaction(conn):
+            # Another process may have migrated while we waited for the write lock.
+            version = schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                break
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def migrate(db_path=DB_PATH):
+    """``init_db`` once per process and database; Streamlit reruns after the first skip it entirely."""
+    with perf.timed("init_db"):
+        if db_path in _migrated:
+            return
+        with _migrated_lock:
+            if db_path not in _migrated:
+                with connection(db_path) as conn:
+                    init_db(conn)
+                _migrated.add(db_path)
+
+
+def data_version(conn):
+    """Token that changes whenever a submission is written."""
+    return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+
+# --- Submissions ---
+
+def submission_record(proposal):
+    """Column values for one ``payload.Proposal``, in ``upsert_submissions`` order."""
+    submitter = proposal.submitter
+    return (
+        submitter.facility_code,
+        submitter.employee_id,
+        float(submitter.latitude),
+        float(submitter.longitude),
+        submitter.drive_link or "",
+        proposal.need_identification.need_score,
+        proposal.operations_network.ops_score,
+        proposal.location_strategy.loc_score,
+        proposal.facility_specs.facility_score,
+        float(proposal.totals.total_score),
+        _operations_json(proposal.operations_network.ops_selected),
+        payload.encode(proposal),
+    )
+
+
+def upsert_submissions(conn, records):
+    """Insert or update many submissions in a single transaction.
+
+    ``records`` are tuples from ``submission_record``. Like the Submit Proposal
+    form, a facility_code that already exists has its row overwritten; when a
+    batch repeats a code, the last record wins. Returns the number of records
+    written.
+    """
+    records = list(records)
+    if not records:
+        return 0
+    with transaction(conn):
+        conn.executemany(SQL_UPSERT, records)
+    return len(records)
+
+
+def save_submission(conn, proposal):
+    upsert_submissions(conn, [submission_record(proposal)])
+
+
+def facility_codes(conn):
+    return [r[0] for r in conn.execute(SQL_FACILITY_CODES)]
+
+
+def facility_locations(conn):
+    """(facility_code, latitude, longitude) for every facility with a location."""
+    return conn.execute(SQL_FACILITY_LOCATIONS).fetchall()
+
+
+def latest_payloads(conn):
+    """Cursor over (facility_code, stored payload) for every facility, by code."""
+    return conn.execute(SQL_LATEST_PAYLOADS)
+
+
+def facility_history(conn, facility_code):
+    """Every recorded version of a facility, newest first: (rows, column names). Payloads are not read."""
+    cur = conn.execute(SQL_FACILITY_HISTORY, (facility_code,))
+    return cur.fetchall(), [d[0] for d in cur.description]
+
+
+def facility_version_payloads(conn, facility_code, versions):
+    """{version: stored payload (see ``payload.decode``)} for the given versions of a facility."""
+    rows = conn.execute(
+        "SELECT version, payload FROM submission_versions "
+        "WHERE facility_code = ? AND version IN (SELECT value FROM json_each(?))",
+        (facility_code, json.dumps([int(v) for v in versions])),
+    )
+    return dict(rows.fetchall())
+
+
+def _listing_filter(facilities=(), score_ranges=None, submitted=None, operations=()):
+    """WHERE clause and params for the latest-per-facility listing.
+
+    ``score_ranges`` maps a score column to ``(low, high)``; either bound may
+    be None. ``submitted`` is a ``(start, end)`` range of created_at values
+    (``YYYY-MM-DD[ HH:MM:SS]`` text), start inclusive and end exclusive;
+    either bound may be None. ``operations`` keeps the submissions that
+    selected every one of the given operation types.
+    """
+    clauses = [LATEST_PER_FACILITY]
+    params = []
+    if facilities:
+        clauses.append("facility_code IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(facilities)))
+    for column, (low, high) in (score_ranges or {}).items():
+        if column not in SCORE_COLUMNS + ("total_score",):
+            raise ValueError(f"cannot filter on {column!r}")
+        if low is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(high)
+    start, end = submitted or (None, None)
+    if start is not None:
+        clauses.append("created_at >= ?")
+        params.append(str(start))
+    if end is not None:
+        clauses.append("created_at < ?")
+        params.append(str(end))
+    if operations:
+        clauses.append(
+            "NOT EXISTS (SELECT value FROM json_each(?) EXCEPT SELECT value FROM json_each(coalesce(operations, '[]')))"
+        )
+        params.append(json.dumps(list(operations)))
+    return " AND ".join(clauses), params
+
+
+def _order_by(sort, descending):
+    if sort not in SORT_KEYS:
+        raise ValueError(f"cannot sort by {sort!r}")
+    direction = "DESC" if descending else "ASC"
+    return f"{SORT_KEYS[sort]} {direction}, id {direction}"
+
+
+def count_summaries(conn, facilities=(), score_ranges=None, submitted=None):
+    where, params = _listing_filter(facilities, score_ranges, submitted)
+    return conn.execute(f"SELECT count(*) FROM submissions WHERE {where}", params).fetchone()[0]
+
+
+def summary_page(
+    conn, facilities=(), score_ranges=None, submitted=None, sort="created_at", descending=True, limit=50, offset=0
+):
+    """One page of the latest-per-facility summary: (rows, column names).
+
+    Filtering, sorting and paging all happen in SQL; only ``limit`` rows are
+    read, and never the payload.
+    """
+    where, params = _listing_filter(facilities, score_ranges, submitted)
+    cur = conn.execute(
+        f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM submissions WHERE {where} "
+        f"ORDER BY {_order_by(sort, descending)} LIMIT ? OFFSET ?",
+        params + [int(limit), int(offset)],
+    )
+    return cur.fetchall(), [d[0] for d in cur.description]
+
+
+def matching_submissions(conn, facilities=(), score_ranges=None, submitted=None, sort="created_at", descending=True):
+    """Cursor over full rows (EXPORT_COLUMNS, payload included) for every submission the listing filter matches."""
+    where, params = _listing_filter(facilities, score_ranges, submitted)
+    return conn.execute(
+        f"SELECT {', '.join(EXPORT_COLUMNS)} FROM submissions WHERE {where} ORDER BY {_order_by(sort, descending)}",
+        params,
+    )
+
+
+def top_sites(conn, k=20, facilities=(), min_scores=None, operations=(), sort="total_score"):
+    """The ``k`` best latest-per-facility rows by ``sort`` (highest first): (rows, column names).
+
+    ``min_scores`` maps a score column to its threshold, ``facilities``
+    restricts the candidates (e.g. to those within a radius, see
+    ``geo.GridIndex``) and ``operations`` to the submissions that selected
+    all of those operation types. With no facility restriction the query
+    walks the sort column's index and stops after ``k`` matches.
+    """
+    score_ranges = {column: (low, None) for column, low in (min_scores or {}).items()}
+    where, params = _listing_filter(facilities, score_ranges, operations=operations)
+    cur = conn.execute(
+        f"SELECT {', '.join(TOP_SITE_COLUMNS)} FROM submissions WHERE {where} "
+        f"ORDER BY {_order_by(sort, True)} LIMIT ?",
+        params + [int(k)],
+    )
+    return cur.fetchall(), [d[0] for d in cur.description]
+
+
+def submissions_by_ids(conn, ids):
+    """Cursor over full rows (EXPORT_COLUMNS, payload included) for the given ids, newest first."""
+    return conn.execute(SQL_SUBMISSIONS_BY_IDS, (json.dumps([int(i) for i in ids]),))
+
+
+# --- Re-scoring ---
+
+SQL_RESCORE_BATCH = "SELECT id, payload FROM submissions WHERE id > ? AND id <= ? ORDER BY id LIMIT ?"
+# Matching on the old payload skips rows the app rewrote since the batch was read.
+SQL_RESCORE_UPDATE = """
+    UPDATE submissions
+    SET need_score = ?, ops_score = ?, loc_score = ?, facility_score = ?, total_score = ?, payload = ?
+    WHERE id = ? AND payload = ?
+"""
+
+
+def rescore_checkpoint(conn, key):
+    """Last submission id already re-scored under rubric ``key`` (0 if none)."""
+    row = conn.execute("SELECT last_id FROM rescore_checkpoints WHERE rubric = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def reset_rescore_checkpoint(conn, key):
+    conn.execute("DELETE FROM rescore_checkpoints WHERE rubric = ?", (key,))
+
+
+def max_submission_id(conn):
+    return conn.execute("SELECT coalesce(max(id), 0) FROM submissions").fetchone()[0]
+
+
+def rescore_batches(conn, after_id, up_to_id, batch_size):
+    """Yield lists of (id, payload) in id order, ``batch_size`` rows at a time."""
+    while True:
+        rows = conn.execute(SQL_RESCORE_BATCH, (after_id, up_to_id, batch_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def apply_rescored(conn, key, last_id, updates):
+    """Write one batch of re-scored rows and advance the checkpoint in the same transaction.
+
+    ``updates`` are (need, ops, loc, facility, total, new payload, id, old payload)
+    tuples. Returns the number of rows changed.
+    """
+    with transaction(conn):
+        changed = conn.executemany(SQL_RESCORE_UPDATE, updates).rowcount if updates else 0
+        conn.execute(
+            "INSERT INTO rescore_checkpoints (rubric, last_id) VALUES (?, ?) "
+            "ON CONFLICT(rubric) DO UPDATE SET last_id = excluded.last_id, updated_at = CURRENT_TIMESTAMP",
+            (key, last_id),
+        )
+    return changed
@@ -0,0 +1,176 @@
+"""Export submissions (flattened payloads) as CSV, gzip-compressed CSV or Parquet.
+
+Rows are streamed from a SQLite cursor in batches and written out as they
+are decoded. Columns come from the fixed payload schema
+(``payload.PAYLOAD_SECTIONS``), so there is no per-export schema inference
+and memory use is bounded by the batch size, not the size of the table.
+
+    python export.py -o submissions.parquet
+    python export.py --format csv.gz -o submissions.csv.gz
+"""
+import argparse
+import csv
+import gzip
+import io
+import sys
+
+import db
+import payload
+import perf
+
+BATCH_SIZE = 1000
+
+FORMATS = {
+    # format -> (label, file extension, MIME type)
+    "csv": ("CSV", "csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", "csv.gz", "application/gzip"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+# Basics and scores first, then every other payload field in form order.
+_PREFERRED = [
+    ("submitter", "facility_code"), ("submitter", "employee_id"), ("submitter", "latitude"),
+    ("submitter", "longitude"), ("submitter", "drive_link"),
+    ("need_identification", "need_score"), ("operations_network", "ops_score"),
+    ("location_strategy", "loc_score"), ("facility_specs", "facility_score"),
+    ("totals", "total_score"),
+]
+EXPORT_FIELDS = _PREFERRED + [
+    (section, field)
+    for section, fields in payload.PAYLOAD_SECTIONS.items()
+    for field, _ in fields
+    if (section, field) not in _PREFERRED
+]
+EXPORT_HEADER = [f"{section}.{field}" for section, field in EXPORT_FIELDS]
+_KINDS = [payload.FIELD_KINDS[field] for _, field in EXPORT_FIELDS]
+# Position of each export field in Proposal.values()
+_POSITIONS = {key: i for i, key in enumerate(
+    (section, field) for section, fields in payload.PAYLOAD_SECTIONS.items() for field, _ in fields
+)}
+_INDEX = [_POSITIONS[key] for key in EXPORT_FIELDS]
+
+# Row columns used when the payload lacks a submitter value.
+_SUBMITTER_FALLBACK = ("facility_code", "employee_id", "latitude", "longitude", "drive_link")
+
+
+def _typed(kind, value):
+    return None if value is None else payload.coerce(kind, value)
+
+
+def flatten_row(row):
+    """One ``db.EXPORT_COLUMNS`` row -> list of values in EXPORT_HEADER order."""
+    record = dict(zip(db.EXPORT_COLUMNS, row))
+    proposal = payload.decode(record["payload"]) or payload.Proposal()
+    submitter = proposal.submitter
+    for key in _SUBMITTER_FALLBACK:
+        if getattr(submitter, key) is None:
+            setattr(submitter, key, record[key])
+    values = proposal.values()
+    return [_typed(kind, values[i]) for i, kind in zip(_INDEX, _KINDS)]
+
+
+def iter_rows(cursor, batch_size=BATCH_SIZE):
+    """Yield lists of flattened rows, ``batch_size`` at a time."""
+    while True:
+        with perf.timed("sql"):
+            rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        perf.count("rows", len(rows))
+        with perf.timed("decode"):
+            batch = [flatten_row(r) for r in rows]
+        yield batch
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return value
+
+
+def write_csv(cursor, out, compress=False, batch_size=BATCH_SIZE):
+    """Write CSV (gzip-compressed if ``compress``) to the binary file ``out``."""
+    raw = gzip.GzipFile(fileobj=out, mode="wb", mtime=0) if compress else out
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_HEADER)
+        for batch in iter_rows(cursor, batch_size):
+            writer.writerows([_csv_cell(v) for v in row] for row in batch)
+        text.flush()
+    finally:
+        # Detach so closing the wrapper does not close the caller's file.
+        text.detach()
+        if compress:
+            raw.close()
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    types = {"text": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "list": pa.list_(pa.string())}
+    return pa.schema([(name, types[kind]) for name, kind in zip(EXPORT_HEADER, _KINDS)])
+
+
+def write_parquet(cursor, out, batch_size=BATCH_SIZE):
+    """Write Parquet to ``out``, one row group per batch. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for batch in iter_rows(cursor, batch_size):
+            columns = dict(zip(EXPORT_HEADER, (list(column) for column in zip(*batch))))
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+def write(fmt, cursor, out, batch_size=BATCH_SIZE):
+    if fmt == "parquet":
+        with perf.timed("parquet"):
+            write_parquet(cursor, out, batch_size)
+    else:
+        with perf.timed("csv"):
+            write_csv(cursor, out, compress=(fmt == "csv.gz"), batch_size=batch_size)
+
+
+def export_bytes(
+    fmt, ids=None, facilities=(), score_ranges=None, submitted=None, sort="created_at", descending=True,
+    db_path=db.READ_DB_PATH,
+):
+    """Whole export as bytes, for st.download_button.
+
+    Exports the given submission ``ids``, or when there are none, every
+    submission matching the dashboard filters.
+    """
+    buffer = io.BytesIO()
+    with perf.recording(f"export {fmt}"), db.connection(db_path) as conn:
+        if ids:
+            cursor = db.submissions_by_ids(conn, ids)
+        else:
+            cursor = db.matching_submissions(conn, facilities, score_ranges, submitted, sort, descending)
+        write(fmt, cursor, buffer)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the latest submission per facility.")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--db", default=db.DB_PATH, help=f"database path (default: {db.DB_PATH})")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        with db.connection(args.db) as conn:
+            db.init_db(conn)
+            write(args.format, db.matching_submissions(conn), out)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Spatial indexes for radius and nearest-neighbour queries.
+
+Points (facilities, airports) and line segments (highways) are bucketed into
+a fixed grid of latitude/longitude cells about ``cell_km`` on a side. A
+radius query only looks at the cells that can overlap the circle and
+measures great-circle (haversine) distance to what is in them, so it costs a
+handful of distance checks however much is indexed. Nearest queries widen
+the radius until something is found.
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+HUB_RADIUS_KM = 20.0
+# Nearest-neighbour searches give up beyond this distance.
+MAX_NEAREST_KM = 2500.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_point(lat, lon):
+    return lat is not None and lon is not None and -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+class _Grid:
+    """Grid of lat/lon cells; subclasses decide what goes in the cells."""
+
+    def __init__(self, cell_km):
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.columns = math.ceil(360.0 / self.cell_deg)
+        self._cells = {}
+
+    def _cell(self, lat, lon):
+        row = math.floor((lat + 90.0) / self.cell_deg)
+        col = math.floor((lon + 180.0) / self.cell_deg) % self.columns
+        return row, col
+
+    def _candidate_cells(self, lat, lon, radius_km):
+        radius_deg = radius_km / KM_PER_DEGREE
+        row_lo = math.floor((max(lat - radius_deg, -90.0) + 90.0) / self.cell_deg)
+        row_hi = math.floor((min(lat + radius_deg, 90.0) + 90.0) / self.cell_deg)
+        # Longitude degrees shrink with cos(latitude); widen the search at the
+        # band's highest latitude and take every column near the poles.
+        edge_lat = min(abs(lat) + radius_deg, 90.0)
+        cos_edge = math.cos(math.radians(edge_lat))
+        if cos_edge <= 1e-9 or radius_deg / cos_edge >= 180.0:
+            cols = range(self.columns)
+        else:
+            span = radius_deg / cos_edge
+            col_lo = math.floor((lon - span + 180.0) / self.cell_deg)
+            col_hi = math.floor((lon + span + 180.0) / self.cell_deg)
+            if col_hi - col_lo + 1 >= self.columns:
+                cols = range(self.columns)
+            else:
+                cols = {c % self.columns for c in range(col_lo, col_hi + 1)}
+        for row in range(row_lo, row_hi + 1):
+            for col in cols:
+                bucket = self._cells.get((row, col))
+                if bucket:
+                    yield bucket
+
+    def nearest(self, lat, lon, max_km=MAX_NEAREST_KM):
+        """``(key, distance_km)`` of the closest entry within ``max_km``, or None."""
+        radius = self.cell_km
+        while True:
+            found = self.within(lat, lon, min(radius, max_km))
+            if found:
+                return found[0]
+            if radius >= max_km:
+                return None
+            radius *= 2
+
+
+class GridIndex(_Grid):
+    """Facility code -> (lat, lon), bucketed by grid cell."""
+
+    def __init__(self, cell_km=HUB_RADIUS_KM):
+        super().__init__(cell_km)
+        self._points = {}
+
+    @classmethod
+    def from_rows(cls, rows, cell_km=HUB_RADIUS_KM):
+        """Build from ``(facility_code, latitude, longitude)`` rows."""
+        index = cls(cell_km)
+        for code, lat, lon in rows:
+            index.add(code, lat, lon)
+        return index
+
+    def __len__(self):
+        return len(self._points)
+
+    def add(self, code, lat, lon):
+        """Insert or move ``code``; points outside valid lat/lon are ignored."""
+        self.remove(code)
+        if not valid_point(lat, lon):
+            return
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, set()).add(code)
+        self._points[code] = (lat, lon, cell)
+
+    def remove(self, code):
+        point = self._points.pop(code, None)
+        if point is not None:
+            bucket = self._cells[point[2]]
+            bucket.discard(code)
+            if not bucket:
+                del self._cells[point[2]]
+
+    def within(self, lat, lon, radius_km=HUB_RADIUS_KM, exclude=None):
+        """``[(facility_code, distance_km), ...]`` within ``radius_km``, nearest first.
+
+        ``exclude`` drops one facility code, e.g. the facility being proposed.
+        """
+        if not valid_point(lat, lon):
+            return []
+        found = []
+        for bucket in self._candidate_cells(lat, lon, radius_km):
+            for code in bucket:
+                if code == exclude:
+                    continue
+                p_lat, p_lon, _ = self._points[code]
+                distance = haversine_km(lat, lon, p_lat, p_lon)
+                if distance <= radius_km:
+                    found.append((code, distance))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return found
+
+    def count_within(self, lat, lon, radius_km=HUB_RADIUS_KM, exclude=None):
+        return len(self.within(lat, lon, radius_km, exclude))
+
+
+def point_segment_km(lat, lon, lat1, lon1, lat2, lon2):
+    """Distance in km from a point to the segment between two points.
+
+    The closest point is found on a local flat projection around ``(lat, lon)``
+    and then measured with haversine, which is accurate for the segment
+    lengths the indexes store (a cell or less).
+    """
+    kx = math.cos(math.radians(lat)) * KM_PER_DEGREE
+    ax, ay = _wrap(lon1 - lon) * kx, (lat1 - lat) * KM_PER_DEGREE
+    dlon = _wrap(lon2 - lon1)
+    dx, dy = dlon * kx, (lat2 - lat1) * KM_PER_DEGREE
+    length2 = dx * dx + dy * dy
+    t = 0.0 if length2 == 0 else min(1.0, max(0.0, -(ax * dx + ay * dy) / length2))
+    return haversine_km(lat, lon, lat1 + t * (lat2 - lat1), lon1 + t * dlon)
+
+
+def _wrap(dlon):
+    return (dlon + 180.0) % 360.0 - 180.0
+
+
+class SegmentIndex(_Grid):
+    """Named polylines (e.g. highways) split into short segments, bucketed by grid cell."""
+
+    def __init__(self, cell_km=50.0):
+        super().__init__(cell_km)
+        self._segments = []
+
+    @classmethod
+    def from_polylines(cls, polylines, cell_km=50.0):
+        """Build from ``{name: [(lat, lon), ...]}``."""
+        index = cls(cell_km)
+        for name, points in polylines.items():
+            index.add_polyline(name, points)
+        return index
+
+    def __len__(self):
+        return len(self._segments)
+
+    def add_polyline(self, name, points):
+        points = [(lat, lon) for lat, lon in points if valid_point(lat, lon)]
+        for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+            # Split long segments so each one only covers a few cells.
+            pieces = max(1, math.ceil(haversine_km(lat1, lon1, lat2, lon2) / self.cell_km))
+            dlat, dlon = (lat2 - lat1) / pieces, _wrap(lon2 - lon1) / pieces
+            for i in range(pieces):
+                self._add_segment(name, lat1 + i * dlat, lon1 + i * dlon, lat1 + (i + 1) * dlat, lon1 + (i + 1) * dlon)
+
+    def _add_segment(self, name, lat1, lon1, lat2, lon2):
+        segment_id = len(self._segments)
+        self._segments.append((name, lat1, lon1, lat2, lon2))
+        row_lo, col_lo = self._cell(min(lat1, lat2), min(lon1, lon2))
+        row_hi, col_hi = self._cell(max(lat1, lat2), max(lon1, lon2))
+        if col_hi < col_lo:
+            col_hi += self.columns
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                self._cells.setdefault((row, col % self.columns), set()).add(segment_id)
+
+    def within(self, lat, lon, radius_km):
+        """``[(name, distance_km), ...]`` for polylines passing within ``radius_km``, nearest first."""
+        if not valid_point(lat, lon):
+            return []
+        best = {}
+        seen = set()
+        for bucket in self._candidate_cells(lat, lon, radius_km):
+            for segment_id in bucket - seen:
+                seen.add(segment_id)
+                name, lat1, lon1, lat2, lon2 = self._segments[segment_id]
+                distance = point_segment_km(lat, lon, lat1, lon1, lat2, lon2)
+                if distance <= radius_km and distance < best.get(name, math.inf):
+                    best[name] = distance
+        return sorted(best.items(), key=lambda item: (item[1], item[0]))
@@ -0,0 +1,227 @@
+"""Load test for the multi-process deployment (see api.py).
+
+    python loadtest.py --db big.db --workers 1 2 4 8 --duration 10
+    python loadtest.py --db big.db --mode direct    # every worker on the copied database itself
+
+Copies the ``--db`` database into a temporary directory, so the original is
+never written, and, for each worker count, runs that many processes acting
+like app workers for ``--duration`` seconds. Each one loops over a
+dashboard-like mix: summary pages, filtered listings, an occasional full
+CSV export, and submissions, which resubmit proposals already in the
+database under new facility codes. In ``snapshot`` mode (the default) the
+reads go to a read-only snapshot and the submissions to a write API process
+started for the run; in ``direct`` mode every worker reads and writes the
+database file, as a single deployment does. Prints operations per second
+and latency percentiles per worker count, and with ``--json`` also writes
+them to a file.
+"""
+import argparse
+import dataclasses
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+import api
+import db
+import export
+import payload
+
+# Operation -> share of a worker's operations (submissions use --write-share)
+READ_MIX = {"page": 0.65, "filter": 0.32, "export": 0.03}
+# Stored proposals each worker picks its submissions from
+RESUBMIT_SAMPLE = 1000
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1.0):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def copy_database(db_path, dest_path):
+    """Copy ``db_path`` to ``dest_path`` (a consistent copy even while it is being written) and migrate the copy."""
+    source = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    dest = sqlite3.connect(dest_path)
+    try:
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+    db.migrate(dest_path)
+
+
+def resubmissions(db_path, seed, prefix):
+    """Endless proposals from ``db_path``, picked at random, each under a new facility code ``prefix`` + n."""
+    conn = db.get_connection(db_path)
+    try:
+        stored = itertools.islice(db.latest_payloads(conn), RESUBMIT_SAMPLE)
+        proposals = [p for p in (payload.decode(s) for _, s in stored) if p and not payload.validation_errors(p)]
+    finally:
+        conn.close()
+    if not proposals:
+        raise ValueError(f"{db_path} has no complete submissions to resubmit")
+    rng = random.Random(seed)
+    for n in itertools.count():
+        proposal = rng.choice(proposals)
+        submitter = dataclasses.replace(proposal.submitter, facility_code=f"{prefix}{n}")
+        yield dataclasses.replace(proposal, submitter=submitter)
+
+
+def _read(conn, op, rng):
+    if op == "page":
+        total = db.count_summaries(conn)
+        db.summary_page(conn, sort="total_score", limit=50, offset=rng.randrange(max(1, total - 50)))
+    elif op == "filter":
+        low = rng.uniform(20, 60)
+        db.count_summaries(conn, score_ranges={"total_score": (low, None)})
+        db.summary_page(conn, score_ranges={"total_score": (low, None)}, sort="loc_score", limit=50)
+    else:
+        with open(os.devnull, "wb") as out:
+            export.write("csv", db.matching_submissions(conn), out)
+
+
+def _worker(index, mode, paths, api_url, duration, write_share, start, results):
+    rng = random.Random(index)
+    if mode == "snapshot":
+        pool = db.ConnectionPool(paths["snapshot"], size=1, readonly=True)
+    else:
+        pool = db.ConnectionPool(paths["db"], size=1)
+    ops, weights = zip(*READ_MIX.items())
+    timings = {op: [] for op in (*ops, "submit")}
+    new_rows = resubmissions(paths["db"], seed=index, prefix=f"LOADTEST-{index}-")
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while True:
+        began = time.perf_counter()
+        if began >= deadline:
+            break
+        if rng.random() < write_share:
+            op = "submit"
+            proposal = next(new_rows)
+            if mode == "snapshot":
+                api.put_submission(proposal, api_url)
+            else:
+                with pool.connection() as conn:
+                    db.save_submission(conn, proposal)
+        else:
+            op = rng.choices(ops, weights)[0]
+            with pool.connection() as conn:
+                _read(conn, op, rng)
+        timings[op].append(time.perf_counter() - began)
+    results.put(timings)
+
+
+def run(mode, paths, api_url, workers, duration, write_share):
+    """Timings of every operation of ``workers`` processes: {op: [seconds, ...]}."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    start = ctx.Event()
+    procs = [
+        ctx.Process(target=_worker, args=(i, mode, paths, api_url, duration, write_share, start, results))
+        for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    # Workers load their proposals first; start the clock together.
+    time.sleep(1.0)
+    start.set()
+    merged = {}
+    for _ in procs:
+        for op, times in results.get().items():
+            merged.setdefault(op, []).extend(times)
+    for p in procs:
+        p.join()
+    return merged
+
+
+def summarize(workers, duration, timings):
+    total = sum(len(t) for t in timings.values())
+    row = {"workers": workers, "ops_per_s": total / duration}
+    for op, times in timings.items():
+        if times:
+            row[op] = {
+                "count": len(times),
+                "p50_ms": float(np.percentile(times, 50) * 1000),
+                "p99_ms": float(np.percentile(times, 99) * 1000),
+            }
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of the app's database workload against worker count.")
+    parser.add_argument("--mode", choices=("snapshot", "direct"), default="snapshot")
+    parser.add_argument("--db", required=True, help="submissions database to copy and run against")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker counts to run")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count (default: 10)")
+    parser.add_argument("--write-share", type=float, default=0.1, help="share of operations that submit (default: 0.1)")
+    parser.add_argument("--snapshot-interval", type=float, default=2.0, help="write API snapshot refresh (default: 2s)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"db": os.path.join(tmp, "submissions.db"), "snapshot": os.path.join(tmp, "snapshot.db")}
+        copy_database(args.db, paths["db"])
+        try:
+            # Fail here rather than in every worker when there is nothing to resubmit.
+            next(resubmissions(paths["db"], seed=0, prefix=""))
+        except ValueError:
+            parser.error(f"{args.db} has no complete submissions to resubmit")
+
+        server = api_url = None
+        if args.mode == "snapshot":
+            port = free_port()
+            api_url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen([
+                sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py"),
+                "--db", paths["db"], "--snapshot", paths["snapshot"],
+                "--snapshot-interval", str(args.snapshot_interval), "--port", str(port),
+            ])
+        try:
+            if server is not None:
+                wait_for(f"{api_url}/version")
+            report = []
+            for workers in args.workers:
+                timings = run(args.mode, paths, api_url, workers, args.duration, args.write_share)
+                row = summarize(workers, args.duration, timings)
+                report.append(row)
+                latencies = "  ".join(
+                    f"{op} p50 {row[op]['p50_ms']:.1f} / p99 {row[op]['p99_ms']:.1f} ms"
+                    for op in (*READ_MIX, "submit") if op in row
+                )
+                print(f"{args.mode:8} workers={workers:<3} {row['ops_per_s']:8.1f} ops/s  {latencies}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mode": args.mode, "db": args.db, "duration": args.duration, "results": report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Layout of the submission payload stored in ``submissions.payload``.
+
+A submission is a ``Proposal``: one slotted dataclass per section, with
+typed fields in the order the Submit Proposal form writes them. The form,
+the DB layer, scoring, exports and the dashboard all pass Proposals
+around; stored, it is the nested dict of sections from ``to_dict``.
+Sections and the proposal also answer ``.get(name)``, so scoring rules
+read them the same way as plain dicts. Field names are unique across
+sections, so a proposal can also be handled as one flat row (CSV/JSONL
+imports, DataFrames) and nested back when it is saved.
+
+Stored payloads are JSON text by default. With
+``FACILITY_PAYLOAD_ENCODING=compact`` new writes store a zlib-compressed
+JSON array of the field values in a numbered layout instead, so the key
+names are not repeated in every row. ``decode`` reads either form, so the
+two can coexist in one database.
+"""
+import dataclasses
+import itertools
+import json
+import math
+import os
+import typing
+import zlib
+
+import pandas as pd
+
+import perf
+
+
+class _Section:
+    __slots__ = ()
+    FIELDS = ()
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        """Section from a dict of stored values; unknown keys are ignored, missing ones are None."""
+        return cls(*map(values.get, cls.FIELDS)) if isinstance(values, dict) else cls()
+
+
+def _section(cls):
+    cls = dataclasses.dataclass(slots=True)(cls)
+    cls.FIELDS = tuple(f.name for f in dataclasses.fields(cls))
+    return cls
+
+
+@_section
+class Submitter(_Section):
+    facility_code: str | None = None
+    employee_id: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    drive_link: str | None = None
+
+
+@_section
+class NeedIdentification(_Section):
+    scenario: str | None = None
+    util: int | None = None
+    process_improve: bool | None = None
+    bypass_plan: bool | None = None
+    ext_planned: str | None = None
+    restructure: list[str] | None = None
+    need_score: float | None = None
+
+
+@_section
+class OperationsNetwork(_Section):
+    ops_selected: list[str] | None = None
+    hubs_radius: int | None = None
+    airport_dist: float | None = None
+    highway_dist: float | None = None
+    budget_cost_sft: float | None = None
+    proposed_cost_sft: float | None = None
+    cost_ratio_budget_to_proposed: float | None = None
+    ops_score: float | None = None
+
+
+@_section
+class LocationStrategy(_Section):
+    log_clusters: bool | None = None
+    infra_future: bool | None = None
+    connect_highway: bool | None = None
+    hazard_free: bool | None = None
+    zoning_ok: bool | None = None
+    utilities_ready: bool | None = None
+    support_services: bool | None = None
+    labor_available: bool | None = None
+    loc_score: float | None = None
+
+
+@_section
+class FacilitySpecs(_Section):
+    exp_life: int | None = None
+    req_area: int | None = None
+    clear_height: float | None = None
+    skylight: bool | None = None
+    vent: bool | None = None
+    pillar_width: float | None = None
+    pillar_length: float | None = None
+    floor_load: float | None = None
+    docks: int | None = None
+    docks_over_50ft_info: int | None = None
+    docks_32ft_info: int | None = None
+    recommended_docks: float | None = None
+    enclosed_pct: int | None = None
+    dock_height: float | None = None
+    leveller_pct: int | None = None
+    canopy_len: float | None = None
+    clearance_height: float | None = None
+    side_clearance: float | None = None
+    tail_mate: bool | None = None
+    dual_sided: bool | None = None
+    apron_clearance_info: float | None = None
+    hcv_slots: int | None = None
+    mcv_slots: int | None = None
+    car_slots: int | None = None
+    two_wheeler_slots: int | None = None
+    fire_compliant: bool | None = None
+    office_space_pct: float | None = None
+    fiber_ready: bool | None = None
+    driver_area: bool | None = None
+    beds: int | None = None
+    plinth_height_info: float | None = None
+    plinth_uniform_info: bool | None = None
+    facility_score: float | None = None
+
+
+@_section
+class Totals(_Section):
+    total_score: float | None = None
+
+
+@dataclasses.dataclass(slots=True)
+class Proposal:
+    submitter: Submitter = dataclasses.field(default_factory=Submitter)
+    need_identification: NeedIdentification = dataclasses.field(default_factory=NeedIdentification)
+    operations_network: OperationsNetwork = dataclasses.field(default_factory=OperationsNetwork)
+    location_strategy: LocationStrategy = dataclasses.field(default_factory=LocationStrategy)
+    facility_specs: FacilitySpecs = dataclasses.field(default_factory=FacilitySpecs)
+    totals: Totals = dataclasses.field(default_factory=Totals)
+
+    def get(self, section, default=None):
+        return getattr(self, section, default)
+
+    def sections(self):
+        return (
+            self.submitter, self.need_identification, self.operations_network,
+            self.location_strategy, self.facility_specs, self.totals,
+        )
+
+    def values(self):
+        """Every field value, section by section, in ``PAYLOAD_SECTIONS`` order."""
+        return tuple(itertools.chain.from_iterable(section.values() for section in self.sections()))
+
+    @classmethod
+    def from_values(cls, values):
+        """Inverse of ``values``."""
+        it = iter(values)
+        return cls(*(section_cls(*itertools.islice(it, len(section_cls.FIELDS))) for _, section_cls in SECTION_TYPES))
+
+    def to_dict(self):
+        """Nested dict of sections, as stored in the JSON encoding."""
+        return {name: section.to_dict() for (name, _), section in zip(SECTION_TYPES, self.sections())}
+
+    @classmethod
+    def from_dict(cls, nested):
+        """Proposal from a nested payload dict, taking stored values as they are (no coercion)."""
+        return cls(*(section_cls.from_dict(nested.get(name)) for name, section_cls in SECTION_TYPES))
+
+
+SECTION_TYPES = tuple((f.name, f.type) for f in dataclasses.fields(Proposal))
+
+_KIND_OF_TYPE = {str: "text", int: "int", float: "float", bool: "bool", list: "list"}
+
+
+def _kind(annotation):
+    base = next(t for t in typing.get_args(annotation) if t is not type(None))
+    return _KIND_OF_TYPE[typing.get_origin(base) or base]
+
+
+# (field, kind) per section, in the order the Submit Proposal form writes them.
+PAYLOAD_SECTIONS = {
+    name: [(f.name, _kind(f.type)) for f in dataclasses.fields(section_cls)]
+    for name, section_cls in SECTION_TYPES
+}
+
+FIELD_KINDS = {field: kind for fields in PAYLOAD_SECTIONS.values() for field, kind in fields}
+
+# Flat names of the values derived by scoring rather than entered by the user.
+DERIVED_FIELDS = {
+    "cost_ratio_budget_to_proposed": "cost_ratio",
+    "recommended_docks": "recommended_docks",
+    "need_score": "need_score",
+    "ops_score": "ops_score",
+    "loc_score": "loc_score",
+    "facility_score": "facility_score",
+    "total_score": "total_score",
+}
+
+_TRUE_STRINGS = {"true", "t", "yes", "y", "1"}
+
+
+def _missing(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return isinstance(value, str) and value.strip() == ""
+
+
+def coerce(kind, value):
+    """Convert a raw cell (text from CSV, or a JSON value) to the payload type for ``kind``."""
+    if kind == "list":
+        if isinstance(value, str):
+            return [part.strip() for part in value.split(";") if part.strip()]
+        if isinstance(value, (list, tuple)):
+            return list(value)
+        return []
+    if kind == "bool":
+        if isinstance(value, str):
+            return value.strip().lower() in _TRUE_STRINGS
+        return False if _missing(value) else bool(value)
+    if _missing(value):
+        return None
+    if kind == "text":
+        return str(value).strip()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number):
+        return None
+    if kind == "int":
+        return int(number) if number.is_integer() else None
+    return number
+
+
+def coerce_frame(frame):
+    """Column-wise ``coerce`` for the numeric fields of a flat DataFrame.
+
+    Values that are not numbers, and non-integral values in integer fields,
+    become NaN (unanswered), matching how the form parses its text inputs.
+    """
+    out = frame.copy()
+    for column in frame.columns:
+        kind = FIELD_KINDS.get(column)
+        if kind in ("int", "float"):
+            numbers = pd.to_numeric(frame[column], errors="coerce")
+            if kind == "int":
+                numbers = numbers.where(numbers % 1 == 0)
+            out[column] = numbers
+    return out
+
+
+def nest(flat):
+    """Build a Proposal from a flat mapping of field -> value, coercing each value to its field's kind."""
+    return Proposal(*(
+        section_cls(*(coerce(kind, flat.get(field)) for field, kind in PAYLOAD_SECTIONS[name]))
+        for name, section_cls in SECTION_TYPES
+    ))
+
+
+def flat_fields(data):
+    """Decoded JSON in the payload layout ({section: {field: value}}) or flat -> flat {field: value}, uncoerced."""
+    if not isinstance(data, dict):
+        raise ValueError("a proposal must be a JSON object")
+    flat = {}
+    for key, value in data.items():
+        if key in PAYLOAD_SECTIONS and isinstance(value, dict):
+            flat.update(value)
+        else:
+            flat[key] = value
+    return flat
+
+
+def parse(data):
+    """Build a Proposal from decoded JSON (e.g. a request body), coercing every value like ``nest``.
+
+    ``data`` may use the payload layout ({section: {field: value}}) or be a
+    flat {field: value} mapping. Unknown fields are ignored.
+    """
+    return nest(flat_fields(data))
+
+
+def flatten(proposal):
+    """Inverse of ``nest``: one flat dict with every field."""
+    return dict(zip(FIELD_KINDS, proposal.values()))
+
+
+def validation_errors(proposal):
+    """Same compulsory-field checks as the Submit Proposal form."""
+    submitter = proposal.submitter
+    errors = []
+    if not submitter.facility_code:
+        errors.append("Facility Code is required.")
+    if not submitter.employee_id:
+        errors.append("Employee ID is required.")
+    if submitter.latitude is None:
+        errors.append("Latitude is required and must be a number.")
+    if submitter.longitude is None:
+        errors.append("Longitude is required and must be a number.")
+    if proposal.facility_specs.req_area is None:
+        errors.append("Forecasted minimum facility area is required.")
+    return errors
+
+
+def _empty(value):
+    return _missing(value) or value == []
+
+
+def diff(old, new):
+    """Fields that differ between two Proposals: [(field, old, new), ...] in schema order.
+
+    None, "", NaN and [] all count as empty, so a field left empty in both is not a change.
+    """
+    before, after = flatten(old or Proposal()), flatten(new or Proposal())
+    return [
+        (field, before[field], after[field]) for field in FIELD_KINDS
+        if before[field] != after[field] and not (_empty(before[field]) and _empty(after[field]))
+    ]
+
+
+# --- Stored encoding ---
+
+ENCODINGS = ("json", "compact")
+PAYLOAD_ENCODING = os.environ.get("FACILITY_PAYLOAD_ENCODING") or "json"
+
+# Compact layouts: first byte of the blob -> field order. A layout is never
+# changed once rows use it; schema changes add a new one (and decode maps
+# older layouts onto the current Proposal).
+_LAYOUTS = {
+    1: tuple((section, field) for section, fields in PAYLOAD_SECTIONS.items() for field, _ in fields),
+}
+_CURRENT_LAYOUT = max(_LAYOUTS)
+
+
+def encode(proposal, encoding=None):
+    """Proposal -> value for the ``payload`` column (str for json, bytes for compact)."""
+    encoding = encoding or PAYLOAD_ENCODING
+    if encoding == "json":
+        return json.dumps(proposal.to_dict())
+    if encoding != "compact":
+        raise ValueError(f"unknown payload encoding {encoding!r}; expected one of {ENCODINGS}")
+    text = json.dumps(proposal.values(), separators=(",", ":"))
+    return bytes([_CURRENT_LAYOUT]) + zlib.compress(text.encode(), 9)
+
+
+def decode(stored):
+    """Stored ``payload`` column value (either encoding) -> Proposal, or None if empty or unreadable."""
+    try:
+        if isinstance(stored, (bytes, memoryview)):
+            stored = bytes(stored)
+            fields = _LAYOUTS[stored[0]]
+            values = json.loads(zlib.decompress(stored[1:]))
+            if len(values) < len(fields):
+                return None
+            if fields == _LAYOUTS[_CURRENT_LAYOUT]:
+                return Proposal.from_values(values[:len(fields)])
+            nested = {}
+            for (section, field), value in zip(fields, values):
+                nested.setdefault(section, {})[field] = value
+            return Proposal.from_dict(nested)
+        nested = json.loads(stored) if stored else None
+        return Proposal.from_dict(nested) if isinstance(nested, dict) else None
+    except (ValueError, KeyError, IndexError, TypeError, zlib.error):
+        return None
+
+
+def decode_frame(rows):
+    """``(facility_code, stored payload)`` rows -> one row of payload fields per readable payload, by code."""
+    records = []
+    with perf.timed("decode"):
+        for code, stored in rows:
+            proposal = decode(stored)
+            if proposal is not None:
+                records.append({**flatten(proposal), "facility_code": code})
+    perf.count("rows", len(records))
+    with perf.timed("dataframe"):
+        return pd.DataFrame(records, columns=list(FIELD_KINDS))
@@ -0,0 +1,220 @@
+"""Timings of the phases of a Streamlit rerun, and of exports, for the performance panel.
+
+The app scripts call ``begin`` at the top of each rerun and
+``render_panel`` at the end. In between, the hot paths time themselves with
+``timed(phase)``: ``init_db``, ``sql`` (time holding a pooled connection),
+``decode`` (stored payloads), ``dataframe``, ``data_editor`` and ``csv``
+/ ``parquet`` (export writing). Phases nest: an inner phase's time is not
+counted again in the phase around it, so the phase times add up to at most
+the rerun's elapsed time. ``count`` adds to counters such as ``queries``
+(SQL statements run, counted by ``db.connection``) and ``rows``.
+
+Outside a recording every call here is a no-op, so the API and the
+command-line tools pay nothing. Downloads are built after the rerun that
+rendered their button, so ``export.export_bytes`` makes its own recording.
+
+With FACILITY_ADMIN_PASSCODE set, the sidebar offers a Performance panel
+behind that passcode. With FACILITY_METRICS_LOG set, every finished
+recording is also written to that file: one JSON line per recording, or,
+for a path ending in ``.prom``, the process's running totals in the
+Prometheus text format (for node_exporter's textfile collector). ``{pid}``
+in the path is replaced by the process id, so several app processes can
+each keep their own file.
+"""
+import collections
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+
+ADMIN_PASSCODE = os.environ.get("FACILITY_ADMIN_PASSCODE")
+METRICS_LOG = os.environ.get("FACILITY_METRICS_LOG")
+# Finished recordings kept for the panel, newest last (all sessions of this process).
+RECENT = 50
+
+_local = threading.local()
+_recent = collections.deque(maxlen=RECENT)
+_log_lock = threading.Lock()
+# Running totals for the Prometheus file: (metric, label) -> value
+_totals = collections.Counter()
+
+
+class Recorder:
+    """Phase times and counters of one rerun (or export)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.elapsed = None
+        self.phases = {}  # phase -> [calls, seconds]
+        self.counts = collections.Counter()
+        self._began = time.perf_counter()
+        self._stack = []
+        self._mark = None
+
+    def _enter(self, phase):
+        now = time.perf_counter()
+        if self._stack:
+            self.phases[self._stack[-1]][1] += now - self._mark
+        self.phases.setdefault(phase, [0, 0.0])[0] += 1
+        self._stack.append(phase)
+        self._mark = now
+
+    def _exit(self):
+        now = time.perf_counter()
+        self.phases[self._stack.pop()][1] += now - self._mark
+        self._mark = now
+
+    def count_query(self, statement):
+        """sqlite3 trace callback."""
+        self.counts["queries"] += 1
+
+    def as_record(self):
+        return {
+            "time": datetime.datetime.fromtimestamp(self.started, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "name": self.name,
+            "elapsed_ms": None if self.elapsed is None else self.elapsed * 1000,
+            "phases": {phase: {"calls": calls, "ms": seconds * 1000} for phase, (calls, seconds) in self.phases.items()},
+            "counts": dict(self.counts),
+        }
+
+
+def current():
+    """The recording on this thread, or None."""
+    return getattr(_local, "recorder", None)
+
+
+def begin(name):
+    """Start recording this thread's work as ``name``, dropping any recording left unfinished."""
+    _local.recorder = Recorder(name)
+    return _local.recorder
+
+
+def finish():
+    """End this thread's recording; keeps it for the panel and writes it to METRICS_LOG. Returns it."""
+    recorder = current()
+    if recorder is None:
+        return None
+    _local.recorder = None
+    recorder.elapsed = time.perf_counter() - recorder._began
+    _recent.append(recorder)
+    if METRICS_LOG:
+        _write_log(recorder)
+    return recorder
+
+
+@contextlib.contextmanager
+def recording(name):
+    """``begin``/``finish`` around a block, unless this thread is already recording (then it joins in)."""
+    if current() is not None:
+        yield current()
+        return
+    recorder = begin(name)
+    try:
+        yield recorder
+    finally:
+        finish()
+
+
+@contextlib.contextmanager
+def timed(phase):
+    recorder = current()
+    if recorder is None:
+        yield
+        return
+    recorder._enter(phase)
+    try:
+        yield
+    finally:
+        recorder._exit()
+
+
+def count(name, n=1):
+    recorder = current()
+    if recorder is not None:
+        recorder.counts[name] += n
+
+
+def recent():
+    """Finished recordings of this process, newest first."""
+    return list(reversed(_recent))
+
+
+# --- Metrics log ---
+
+def _write_log(recorder):
+    path = METRICS_LOG.replace("{pid}", str(os.getpid()))
+    with _log_lock:
+        if not path.endswith(".prom"):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(recorder.as_record()) + "\n")
+            return
+        _totals["facility_recordings_total", recorder.name] += 1
+        _totals["facility_recording_seconds_total", recorder.name] += recorder.elapsed
+        for phase, (calls, seconds) in recorder.phases.items():
+            _totals["facility_phase_calls_total", phase] += calls
+            _totals["facility_phase_seconds_total", phase] += seconds
+        for name, n in recorder.counts.items():
+            _totals["facility_count_total", name] += n
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(_prometheus_text())
+        os.replace(tmp_path, path)
+
+
+_PROMETHEUS_LABELS = {
+    "facility_recordings_total": ("name", "Finished recordings (reruns and exports)."),
+    "facility_recording_seconds_total": ("name", "Elapsed time of the finished recordings."),
+    "facility_phase_calls_total": ("phase", "Times each phase was entered."),
+    "facility_phase_seconds_total": ("phase", "Time spent in each phase, excluding nested phases."),
+    "facility_count_total": ("counter", "Queries, rows and other counts."),
+}
+
+
+def _prometheus_text():
+    lines = []
+    for metric, (label, help_text) in _PROMETHEUS_LABELS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for (name, value_label), value in sorted(_totals.items()):
+            if name == metric:
+                lines.append(f'{metric}{{{label}="{value_label}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+# --- Panel ---
+
+def render_panel():
+    """Finish this rerun's recording and, for an admin, show the Performance panel in the sidebar."""
+    import pandas as pd
+    import streamlit as st
+
+    recorder = finish()
+    if not ADMIN_PASSCODE:
+        return
+    with st.sidebar.expander("Performance"):
+        if st.text_input("Admin passcode", type="password", key="perf_admin_passcode") != ADMIN_PASSCODE:
+            return
+        if recorder is not None:
+            record = recorder.as_record()
+            st.caption(f"This rerun: {record['elapsed_ms']:.1f} ms")
+            phases = pd.DataFrame(
+                [(phase, p["calls"], p["ms"]) for phase, p in record["phases"].items()],
+                columns=["phase", "calls", "ms"],
+            )
+            phases.loc[len(phases)] = ["other", None, record["elapsed_ms"] - phases["ms"].sum()]
+            st.dataframe(phases.round({"ms": 1}), hide_index=True, width="stretch")
+            st.dataframe(
+                pd.DataFrame(sorted(record["counts"].items()), columns=["counter", "value"]),
+                hide_index=True, width="stretch",
+            )
+        st.caption(f"Recent reruns and exports (this process, last {RECENT})")
+        history = pd.DataFrame([
+            {"time": r["time"], "name": r["name"], "ms": r["elapsed_ms"], **r["counts"],
+             **{f"{phase} ms": p["ms"] for phase, p in r["phases"].items()}}
+            for r in (rec.as_record() for rec in recent())
+        ])
+        st.dataframe(history.round(1), hide_index=True, width="stretch")
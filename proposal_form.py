@@ -0,0 +1,373 @@
+"""Submit Proposal form, shared by app.py and main_app.py.
+
+The form is split into keyed fragments: site details, one per scoring
+category, and the score summary with the Submit button. A widget's
+callback reruns only its own section and the summary (``st.rerun`` with
+their keys) instead of the whole script, so answering a question
+recomputes one category score, not all four. The answers live in one
+``payload.Proposal`` in ``st.session_state``: each section replaces its
+own part (answers and score) on every run, and the summary and Submit
+read the scores and the whole proposal from there.
+
+Site details are an ``st.form``: the five fields are applied together
+(Enter or the Save button), which also refreshes the operations section,
+whose hub count and distances depend on the coordinates.
+"""
+import streamlit as st
+
+import api
+import dashboard_data
+import db
+import geo
+import payload
+import reference
+import scoring
+
+STATE_KEY = "proposal_form"
+SUMMARY = "proposal_summary"
+
+
+def form_proposal():
+    """The payload.Proposal being edited in this session."""
+    if STATE_KEY not in st.session_state:
+        st.session_state[STATE_KEY] = payload.Proposal()
+    return st.session_state[STATE_KEY]
+
+
+# --- Input helpers ---
+def parse_float(text):
+    try:
+        return float(text) if isinstance(text, str) and text.strip() != "" else None
+    except Exception:
+        return None
+
+
+def parse_int(text):
+    try:
+        return int(text) if isinstance(text, str) and text.strip() != "" else None
+    except Exception:
+        return None
+
+
+def _rerun(*sections):
+    """Widget callback: rerun the given sections and the summary, nothing else."""
+    return lambda: st.rerun([*sections, SUMMARY])
+
+
+def float_input(label: str, placeholder: str = "", on_change=None):
+    raw = st.text_input(label, value="", placeholder=placeholder, on_change=on_change)
+    return parse_float(raw)
+
+
+def int_input(label: str, placeholder: str = "", on_change=None):
+    raw = st.text_input(label, value="", placeholder=placeholder, on_change=on_change)
+    return parse_int(raw)
+
+
+# --- Sections ---
+
+@st.fragment(key="proposal_site")
+def site_section():
+    with st.form("site_details", border=False, enter_to_submit=True):
+        facility_code = st.text_input("Facility Code", max_chars=64)
+        employee_id = st.text_input("Submitter ID or Name", max_chars=64)
+        col1, col2 = st.columns(2)
+        with col1:
+            latitude_input = st.text_input("Latitude", placeholder="e.g., 28.6139")
+        with col2:
+            longitude_input = st.text_input("Longitude", placeholder="e.g., 77.2090")
+        drive_link = st.text_input("Google Drive link (documents/videos)")
+        st.form_submit_button("Save site details", on_click=_rerun("proposal_site", "proposal_ops"))
+
+    form_proposal().submitter = payload.Submitter(
+        facility_code=facility_code.strip(),
+        employee_id=employee_id.strip(),
+        latitude=parse_float(latitude_input),
+        longitude=parse_float(longitude_input),
+        drive_link=drive_link.strip(),
+    )
+
+
+@st.fragment(key="proposal_need")
+def need_section(max_scores):
+    on_change = _rerun("proposal_need")
+    st.header("1. Need Identification Strategy")
+
+    scenario = st.selectbox(
+        "Which scenario triggers the need for a new facility?",
+        scoring.SCENARIOS,
+        on_change=on_change,
+    )
+
+    util = process_improve = bypass_plan = ext_planned = restructure = None
+    if scenario == scoring.SCENARIO_OVERUTILIZATION:
+        util = int_input("Current space utilization (%)", placeholder="e.g., 80", on_change=on_change)
+        process_improve = st.checkbox("Possible to improve internal processes/layout to increase utilization?", on_change=on_change)
+        bypass_plan = st.checkbox("Possible to implement a network bypass or mesh plan?", on_change=on_change)
+    elif scenario == scoring.SCENARIO_EXTERNAL:
+        ext_planned = st.radio("Change nature", ("Planned", "Sudden/Unplanned"), on_change=on_change)
+    elif scenario == scoring.SCENARIO_RESTRUCTURE:
+        restructure = st.multiselect(
+            "Network restructuring reasons (select all that apply):",
+            scoring.RESTRUCTURE_REASONS,
+            on_change=on_change,
+        )
+    else:
+        st.write("Select a scenario to calculate Need Identification score.")
+
+    need = payload.NeedIdentification(
+        scenario=scenario,
+        util=util or None,
+        process_improve=process_improve or None,
+        bypass_plan=bypass_plan or None,
+        ext_planned=ext_planned or None,
+        restructure=restructure or None,
+    )
+    need.need_score = scoring.need_score(need)
+    st.write(f"Need Identification Score: {need.need_score:.1f} / {max_scores['need_score']:g}")
+    form_proposal().need_identification = need
+
+
+@st.fragment(key="proposal_ops")
+def ops_section(max_scores):
+    on_change = _rerun("proposal_ops")
+    submitter = form_proposal().submitter
+    st.header("2. Operations and Network Needs")
+
+    ops = st.multiselect(
+        "Operations required (select all that apply):",
+        scoring.OPERATIONS,
+        on_change=on_change,
+    )
+
+    # Existing hubs within 20 km, counted from the submitted facility locations
+    hubs_radius = None
+    lat_entered, lon_entered = submitter.latitude, submitter.longitude
+    if geo.valid_point(lat_entered, lon_entered):
+        nearby_hubs = dashboard_data.hubs_within(
+            dashboard_data.current_version(), lat_entered, lon_entered, exclude=submitter.facility_code
+        )
+        hubs_radius = len(nearby_hubs)
+        st.write(f"Number of existing hubs within 20 km radius: {hubs_radius}")
+        if nearby_hubs:
+            st.caption(", ".join(f"{code} ({distance:.1f} km)" for code, distance in nearby_hubs))
+    else:
+        st.write("Enter a valid latitude and longitude to count existing hubs within 20 km radius.")
+
+    # Nearest airport/highway distances, looked up in the offline reference files
+    airport_dist = highway_dist = None
+    if scoring.has_air(ops):
+        nearest_airport = reference.nearest_airport(lat_entered, lon_entered)
+        if nearest_airport:
+            airport_dist = nearest_airport[1]
+            st.write(f"Distance to nearest major airport: {airport_dist:.1f} km ({nearest_airport[0]})")
+        else:
+            st.write("Enter a valid latitude and longitude to find the nearest major airport.")
+
+    if scoring.has_surface(ops):
+        nearest_highway = reference.nearest_highway(lat_entered, lon_entered)
+        if nearest_highway:
+            highway_dist = nearest_highway[1]
+            st.write(f"Distance to nearest major highway: {highway_dist:.1f} km ({nearest_highway[0]})")
+        else:
+            st.write("Enter a valid latitude and longitude to find the nearest major highway.")
+
+    # Cost inputs: proposed vs budget; score based on budget/proposed ratio (capped 1.0)
+    budget_cost_sft = float_input(
+        "Budgeted rental cost per sq.ft (in local currency)", placeholder="e.g., 45.0", on_change=on_change
+    )
+    cost_sft = float_input("Proposed rental cost per sq.ft (in local currency)", placeholder="e.g., 50.0", on_change=on_change)
+
+    ops_network = payload.OperationsNetwork(
+        ops_selected=ops,
+        hubs_radius=hubs_radius,
+        airport_dist=airport_dist,
+        highway_dist=highway_dist,
+        budget_cost_sft=budget_cost_sft,
+        proposed_cost_sft=cost_sft,
+        cost_ratio_budget_to_proposed=scoring.cost_ratio(budget_cost_sft, cost_sft),
+    )
+    ops_network.ops_score = scoring.ops_score(ops_network)
+    st.write(f"Operations/Network Needs Score: {ops_network.ops_score:.1f} / {max_scores['ops_score']:g}")
+    # A distance of 0 km is scored, but stored as unanswered.
+    ops_network.airport_dist = airport_dist or None
+    ops_network.highway_dist = highway_dist or None
+    form_proposal().operations_network = ops_network
+
+
+# Location Strategy checkboxes, in scoring.LOCATION_FIELDS order
+LOCATION_LABELS = {
+    "log_clusters": "Located within an existing logistics cluster area",
+    "infra_future": "Future transportation infrastructure (planned highways/rails) is nearby",
+    "connect_highway": "Connected to a major highway within 15 km",
+    "hazard_free": "Not in a known natural hazard zone (e.g. flood, earthquake)",
+    "zoning_ok": "Zoning permits logistics operations",
+    "utilities_ready": "Essential utilities (power, water, telecom, large vehicle access) are available",
+    "support_services": "Support services (fuel, maintenance, driver facilities) are nearby",
+    "labor_available": "Adequate local labor available without major union disputes",
+}
+
+
+@st.fragment(key="proposal_location")
+def location_section(max_scores):
+    on_change = _rerun("proposal_location")
+    st.header("3. Location Strategy")
+
+    location = payload.LocationStrategy(
+        **{field: st.checkbox(LOCATION_LABELS[field], on_change=on_change) for field in scoring.LOCATION_FIELDS}
+    )
+    location.loc_score = scoring.loc_score(location)
+    st.write(f"Location Strategy Score: {location.loc_score:.1f} / {max_scores['loc_score']:g}")
+    form_proposal().location_strategy = location
+
+
+@st.fragment(key="proposal_facility")
+def facility_section(max_scores):
+    on_change = _rerun("proposal_facility")
+
+    def float_field(label, placeholder):
+        return float_input(label, placeholder=placeholder, on_change=on_change)
+
+    def int_field(label, placeholder):
+        return int_input(label, placeholder=placeholder, on_change=on_change)
+
+    def checkbox(label):
+        return st.checkbox(label, on_change=on_change)
+
+    st.header("4. Facility Specifications and Requirements")
+
+    exp_life = int_field("Expected facility operational life (years)", "e.g., 5")
+
+    req_area = int_field("Forecasted minimum facility area required (sq.ft) (info)", "e.g., 100000")
+
+    clear_height = float_field("Clear height required (ft)", "e.g., 30.0")
+
+    skylight = checkbox("Facility has skylights covering 3-5% of roof")
+    vent = checkbox("Facility has ridge ventilators (6-10 per 10,000 sq.ft.)")
+    pillar_width = float_field("Distance between columns (width-wise, ft)", "e.g., 30.0")
+    pillar_length = float_field("Distance between columns (length-wise, ft)", "e.g., 80.0")
+    floor_load = float_field("Floor load capacity (tons/sq.m)", "e.g., 6.0")
+
+    docks = int_field("Number of dock doors", "e.g., 0")
+    # Informational dock counts (no scoring)
+    docks_over_50ft = int_field("Number of docks for vehicles >= 50 ft (info)", "e.g., 4")
+    docks_32ft = int_field("Number of docks for >= 32 ft vehicles (info)", "e.g., 6")
+
+    enclosed_pct = int_field("Percentage of enclosed dock doors", "e.g., 20")
+    dock_height = float_field("Dock height (ft)", "e.g., 14.0")
+    leveller_pct = int_field("Percentage of docks with dock levellers", "e.g., 50")
+    canopy_len = float_field("Canopy length over dock (ft)", "e.g., 15.0")
+    clearance_height = float_field("Clearance height from dock apron (ft)", "e.g., 18.0")
+    side_clearance = float_field("Side clearance from dock doors (ft)", "e.g., 10.0")
+    tail_mate = checkbox("Trucks can tail-mate at 90° angle at docks")
+    dual_sided = checkbox("Dual-sided (opposite) dock operations possible")
+    # Apron clearance informational only (no score)
+    apron_clearance = float_field("No. of Aprons having clearance distance for HCVs (ft) greater than 70 ft (info)", "e.g., 5.0")
+    hcv_slots = int_field("Dedicated HCV parking slots", "e.g., 6")
+    mcv_slots = int_field("Dedicated MCV/LCV parking slots", "e.g., 10")
+    car_slots = int_field("Employee car parking slots", "e.g., 5")
+    two_wheeler_slots = int_field("Employee two-wheeler parking slots", "e.g., 50")
+    fire_compliant = checkbox("Facility fire safety (sprinklers, hydrants) compliant")
+    office_space_pct = float_field("Office space (% of total area)", "e.g., 4.0")
+    fiber_ready = checkbox("High-speed fiber network connectivity ready")
+    driver_area = checkbox("Dedicated driver rest area with basic facilities")
+    beds = int_field("Driver rest room bed capacity", "e.g., 5")
+
+    # Plinth details (informational)
+    plinth_height = float_field("Plinth height (ft) (info)", "e.g., 4.0")
+    plinth_uniform = checkbox("Is plinth height same across all docks? (info)")
+
+    specs = payload.FacilitySpecs(
+        exp_life=exp_life,
+        req_area=req_area,
+        clear_height=clear_height,
+        skylight=bool(skylight),
+        vent=bool(vent),
+        pillar_width=pillar_width,
+        pillar_length=pillar_length,
+        floor_load=floor_load,
+        docks=docks,
+        docks_over_50ft_info=docks_over_50ft,
+        docks_32ft_info=docks_32ft,
+        recommended_docks=scoring.recommended_docks(req_area),
+        enclosed_pct=enclosed_pct,
+        dock_height=dock_height,
+        leveller_pct=leveller_pct,
+        canopy_len=canopy_len,
+        clearance_height=clearance_height,
+        side_clearance=side_clearance,
+        tail_mate=bool(tail_mate),
+        dual_sided=bool(dual_sided),
+        apron_clearance_info=apron_clearance,
+        hcv_slots=hcv_slots,
+        mcv_slots=mcv_slots,
+        car_slots=car_slots,
+        two_wheeler_slots=two_wheeler_slots,
+        fire_compliant=bool(fire_compliant),
+        office_space_pct=office_space_pct,
+        fiber_ready=bool(fiber_ready),
+        driver_area=bool(driver_area),
+        beds=beds,
+        plinth_height_info=plinth_height,
+        plinth_uniform_info=plinth_uniform,
+    )
+    specs.facility_score = scoring.facility_score(specs)
+    st.write(f"Facility Specifications Score: {specs.facility_score:.1f} / {max_scores['facility_score']:g}")
+    form_proposal().facility_specs = specs
+
+
+@st.fragment(key=SUMMARY)
+def summary_section(max_scores):
+    proposal = form_proposal()
+    scores = {
+        "need_score": proposal.need_identification.need_score,
+        "ops_score": proposal.operations_network.ops_score,
+        "loc_score": proposal.location_strategy.loc_score,
+        "facility_score": proposal.facility_specs.facility_score,
+    }
+    total_score = scores["need_score"] + scores["ops_score"] + scores["loc_score"] + scores["facility_score"]
+
+    # Final Score
+    st.header(f"Total Facility Score: {total_score:.1f} / {max_scores['total_score']:g}")
+
+    st.subheader("Score Summary")
+    st.write(f"Need Identification: {scores['need_score']:.1f} / {max_scores['need_score']:g}")
+    st.write(f"Operations/Network: {scores['ops_score']:.1f} / {max_scores['ops_score']:g}")
+    st.write(f"Location Strategy: {scores['loc_score']:.1f} / {max_scores['loc_score']:g}")
+    st.write(f"Facility Specs: {scores['facility_score']:.1f} / {max_scores['facility_score']:g}")
+
+    # Bottom submission button
+    st.write("")
+    if not st.button("Submit Proposal"):
+        return
+
+    proposal.totals = payload.Totals(total_score=total_score)
+    # Validation for compulsory fields
+    errors = payload.validation_errors(proposal)
+    if errors:
+        for e in errors:
+            st.error(e)
+        return
+    try:
+        if api.WRITE_API_URL:
+            # Multi-process deployment: the write API owns the database.
+            api.put_submission(proposal)
+        else:
+            with db.connection() as conn:
+                db.save_submission(conn, proposal)
+        st.session_state['last_submission'] = proposal.submitter.employee_id
+        st.success("Submission saved successfully.")
+    except Exception as e:
+        st.error(f"Failed to save submission: {e}")
+
+
+def render(max_scores):
+    """The whole Submit Proposal form; ``max_scores`` as in ``scoring.Rubric.max_scores``."""
+    if 'last_submission' not in st.session_state:
+        st.session_state['last_submission'] = None
+    site_section()
+    need_section(max_scores)
+    ops_section(max_scores)
+    location_section(max_scores)
+    facility_section(max_scores)
+    summary_section(max_scores)
@@ -0,0 +1,96 @@
+"""Nearest airport and highway distances from the reference files in reference/.
+
+    reference/airports.csv   iata, name, latitude, longitude
+    reference/highways.csv   highway, seq, place, latitude, longitude
+                             (one polyline per highway, vertices in seq order)
+
+The shipped files are a starter set: major Indian airports, and national
+highway corridors traced through the towns they connect, so highway
+distances are approximate to within a few km. Replace them with fuller
+datasets in the same columns as needed; nothing here needs network access.
+Both files are loaded once per process into geo indexes.
+"""
+import csv
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+import geo
+
+REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference")
+AIRPORTS_PATH = os.path.join(REFERENCE_DIR, "airports.csv")
+HIGHWAYS_PATH = os.path.join(REFERENCE_DIR, "highways.csv")
+
+# Grid cell sizes (km) for the two indexes; airports are sparse, highway segments dense.
+AIRPORT_CELL_KM = 50.0
+HIGHWAY_CELL_KM = 25.0
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@functools.lru_cache(maxsize=None)
+def airport_index(path=AIRPORTS_PATH):
+    rows = _read_csv(path)
+    index = geo.GridIndex(AIRPORT_CELL_KM)
+    for row in rows:
+        index.add(f"{row['iata']} - {row['name']}", float(row["latitude"]), float(row["longitude"]))
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def highway_index(path=HIGHWAYS_PATH):
+    polylines = {}
+    for row in sorted(_read_csv(path), key=lambda r: (r["highway"], int(r["seq"]))):
+        polylines.setdefault(row["highway"], []).append((float(row["latitude"]), float(row["longitude"])))
+    return geo.SegmentIndex.from_polylines(polylines, HIGHWAY_CELL_KM)
+
+
+def _rounded(match):
+    # Distances are reported (and scored) to 0.1 km.
+    return (match[0], round(match[1], 1)) if match else None
+
+
+def nearest_airport(lat, lon):
+    """``(airport, distance_km)`` of the closest reference airport, or None."""
+    return _rounded(airport_index().nearest(lat, lon)) if geo.valid_point(lat, lon) else None
+
+
+def nearest_highway(lat, lon):
+    """``(highway, distance_km)`` of the closest reference highway, or None."""
+    return _rounded(highway_index().nearest(lat, lon)) if geo.valid_point(lat, lon) else None
+
+
+def _distance(match):
+    return match[1] if match else None
+
+
+def proximity(lat, lon):
+    """``{"airport_dist": km, "highway_dist": km}`` for one site (None without valid coordinates)."""
+    return {
+        "airport_dist": _distance(nearest_airport(lat, lon)),
+        "highway_dist": _distance(nearest_highway(lat, lon)),
+    }
+
+
+def proximity_frame(latitude, longitude):
+    """``proximity`` for aligned latitude/longitude Series; returns a DataFrame with the same index."""
+    lat = pd.to_numeric(latitude, errors="coerce")
+    lon = pd.to_numeric(longitude, errors="coerce")
+    # Sites sharing coordinates (common in broker lists) are only looked up once.
+    cache = {}
+    airport = np.full(len(lat), np.nan)
+    highway = np.full(len(lat), np.nan)
+    for i, point in enumerate(zip(lat.tolist(), lon.tolist())):
+        if point not in cache:
+            cache[point] = proximity(*point)
+        found = cache[point]
+        if found["airport_dist"] is not None:
+            airport[i] = found["airport_dist"]
+        if found["highway_dist"] is not None:
+            highway[i] = found["highway_dist"]
+    return pd.DataFrame({"airport_dist": airport, "highway_dist": highway}, index=latitude.index)
@@ -0,0 +1,142 @@
+"""Re-score stored submissions under a (new) scoring rubric.
+
+    python rescore.py                          # current rubric.json, all cores
+    python rescore.py --rubric rubric_v2.json --workers 4
+    python rescore.py --restart                # ignore the saved checkpoint
+
+Stored payloads are read in id order, in batches, and scored by a process
+pool; the main process writes each batch back in its own short transaction,
+so the app keeps reading (WAL) and submitting between batches. The last
+re-scored id is saved per rubric in the same transaction as the batch, so an
+interrupted run resumes where it stopped. Rows whose scores do not change
+are not rewritten, and a row the app resubmits while the job runs is left
+alone (it was already scored by the app), so running the job again is a
+no-op.
+"""
+import argparse
+import collections
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import db
+import payload
+import scoring
+
+BATCH_SIZE = 1000
+
+_rules = None
+
+
+def rubric_key(rules):
+    """Checkpoint key: rubric version plus a hash of the config, so edits under the same version re-run."""
+    digest = hashlib.sha1(json.dumps(rules.config, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{rules.version}:{digest}"
+
+
+def _init_worker(config):
+    global _rules
+    _rules = scoring.Rubric(config)
+
+
+def rescore_payload(proposal, rules):
+    """Recompute the derived fields and scores of a Proposal in place; returns the scores."""
+    ops_network = proposal.operations_network
+    ops_network.cost_ratio_budget_to_proposed = scoring.cost_ratio(
+        ops_network.budget_cost_sft, ops_network.proposed_cost_sft
+    )
+    specs = proposal.facility_specs
+    specs.recommended_docks = rules.recommended_docks(specs.req_area)
+    scores = rules.score_proposal(proposal)
+    proposal.need_identification.need_score = scores["need_score"]
+    ops_network.ops_score = scores["ops_score"]
+    proposal.location_strategy.loc_score = scores["loc_score"]
+    specs.facility_score = scores["facility_score"]
+    proposal.totals.total_score = scores["total_score"]
+    return scores
+
+
+def rescore_rows(rows):
+    """Worker: (id, payload) rows -> (last id, update tuples for db.apply_rescored, rows skipped)."""
+    updates = []
+    skipped = 0
+    for row_id, stored in rows:
+        proposal = payload.decode(stored)
+        if proposal is None:
+            skipped += 1
+            continue
+        before = proposal.values()
+        scores = rescore_payload(proposal, _rules)
+        if proposal.values() != before:
+            updates.append((*(scores[c] for c in scoring.SCORE_COLUMNS), payload.encode(proposal), row_id, stored))
+    return rows[-1][0], updates, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored submissions under a scoring rubric.")
+    parser.add_argument("--db", default=db.DB_PATH, help=f"database path (default: {db.DB_PATH})")
+    parser.add_argument("--rubric", default=scoring.RUBRIC_PATH, help="rubric config (default: rubric.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scoring processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"rows per batch (default: {BATCH_SIZE})")
+    parser.add_argument("--restart", action="store_true", help="start from the first row instead of the checkpoint")
+    args = parser.parse_args(argv)
+
+    rules = scoring.load_rubric(args.rubric)
+    key = rubric_key(rules)
+    conn = db.get_connection(args.db)
+    db.init_db(conn)
+    if args.restart:
+        db.reset_rescore_checkpoint(conn, key)
+    start_id = db.rescore_checkpoint(conn, key)
+    # Rows submitted after this point are scored by the app itself.
+    end_id = db.max_submission_id(conn)
+    print(f"Rubric {key}: re-scoring ids {start_id + 1}..{end_id}", file=sys.stderr)
+
+    changed = skipped = 0
+    last_id = start_id
+    started = time.perf_counter()
+
+    def write(result):
+        nonlocal changed, skipped, last_id
+        last_id, updates, batch_skipped = result
+        changed += db.apply_rescored(conn, key, last_id, updates)
+        skipped += batch_skipped
+
+    pool = None
+    try:
+        if args.workers > 1:
+            pool = multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(rules.config,))
+            # A few batches in flight per worker; results are written in id
+            # order, so the checkpoint only ever moves forward.
+            pending = collections.deque()
+            for rows in db.rescore_batches(conn, start_id, end_id, args.batch_size):
+                pending.append(pool.apply_async(rescore_rows, (rows,)))
+                if len(pending) >= 2 * args.workers:
+                    write(pending.popleft().get())
+            while pending:
+                write(pending.popleft().get())
+            pool.close()
+        else:
+            _init_worker(rules.config)
+            for rows in db.rescore_batches(conn, start_id, end_id, args.batch_size):
+                write(rescore_rows(rows))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Done in {elapsed:.1f}s: {changed} submissions re-scored, {skipped} unreadable payloads skipped, "
+        f"checkpoint at id {last_id}.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
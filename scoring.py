@@ -0,0 +1,599 @@
+"""Facility proposal scoring rules.
+
+The same rules back the interactive Submit Proposal form (one proposal at a
+time, see the ``*_score`` functions) and bulk screening of candidate sites
+(``score_frame``, one vectorized pass over a DataFrame or dict of arrays).
+Inputs are keyed by the field names used in the submission payload.
+
+Weights and thresholds come from the rubric config (rubric.json, or the file
+named by $FACILITY_RUBRIC). It is compiled once into a ``Rubric`` holding
+the thresholds and weights as tuples and arrays, and reloaded automatically
+when the file changes, so weights can be tuned without a code change (a bad
+edit is logged and the last good rubric kept). Every function below takes an
+optional ``rules`` (a compiled Rubric) and otherwise uses the current one.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# --- Form options ---
+SCENARIO_OVERUTILIZATION = "Overutilization of existing facility"
+SCENARIO_EXTERNAL = "External factors (e.g., political, natural)"
+SCENARIO_RESTRUCTURE = "Network restructuring (optimization/addition/deletion)"
+SCENARIOS = ("", SCENARIO_OVERUTILIZATION, SCENARIO_EXTERNAL, SCENARIO_RESTRUCTURE)
+
+RESTRUCTURE_REASONS = ["Network optimization", "Long-haul planning change", "Add new facility", "Remove facility"]
+
+OPERATIONS = [
+    "Air Operation", "Surface Express", "Surface LTL", "Unified Operations",
+    "Branch", "Dark Store", "Origin Processing Unit (RTO/DP)",
+]
+AIR_OPERATIONS = ["Air Operation"]
+SURFACE_OPERATIONS = ["Surface Express", "Surface LTL", "Unified Operations"]
+
+LOCATION_FIELDS = [
+    "log_clusters", "infra_future", "connect_highway",
+    "hazard_free", "zoning_ok", "utilities_ready",
+    "support_services", "labor_available",
+]
+
+RUBRIC_PATH = os.environ.get("FACILITY_RUBRIC") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "rubric.json"
+)
+
+SCORE_COLUMNS = ["need_score", "ops_score", "loc_score", "facility_score", "total_score"]
+
+FACILITY_RULES = ("at_least", "between", "flag", "fraction", "docks", "all_at_least")
+
+
+def has_air(ops):
+    return any(o in ops for o in AIR_OPERATIONS)
+
+
+def has_surface(ops):
+    return any(o in ops for o in SURFACE_OPERATIONS)
+
+
+def cost_ratio(budget_cost_sft, proposed_cost_sft):
+    if (budget_cost_sft is not None) and (proposed_cost_sft is not None) and proposed_cost_sft > 0:
+        return budget_cost_sft / proposed_cost_sft
+    return None
+
+
+# --- Rubric config ---
+
+def _at_least_rule(field, low):
+    def score(g):
+        value = g(field)
+        return 1.0 if (value is not None and value >= low) else 0.0
+    return score
+
+
+def _between_rule(field, low, high):
+    def score(g):
+        value = g(field)
+        return 1.0 if (value is not None and low <= value <= high) else 0.0
+    return score
+
+
+def _flag_rule(field):
+    def score(g):
+        return 1.0 if g(field) else 0.0
+    return score
+
+
+def _fraction_rule(field, full_at):
+    def score(g):
+        return min((g(field) or 0), full_at) / full_at
+    return score
+
+
+def _docks_rule(field, sqft_per_dock):
+    def score(g):
+        req_area = g("req_area")
+        docks = g(field)
+        rec_docks = (req_area / sqft_per_dock) if (req_area is not None and req_area > 0) else None
+        if rec_docks is None or docks is None:
+            return 0.0
+        return 1.0 if docks >= rec_docks else docks / rec_docks
+    return score
+
+
+def _all_at_least_rule(minimums):
+    minimums = tuple(minimums.items())
+
+    def score(g):
+        for field, low in minimums:
+            value = g(field)
+            if value is None or value < low:
+                return 0.0
+        return 1.0
+    return score
+
+
+def _number(config, key, where):
+    value = config.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"rubric: {where}.{key} must be a number, got {value!r}")
+    return float(value)
+
+
+def _positive(config, key, where):
+    """A number the scores are divided by."""
+    value = _number(config, key, where)
+    if value <= 0:
+        raise ValueError(f"rubric: {where}.{key} must be greater than zero, got {value!r}")
+    return value
+
+
+def _weights(values, where):
+    """Criterion weights must be non-negative and, since scores are divided by their sum, not all zero."""
+    if any(w < 0 for w in values):
+        raise ValueError(f"rubric: {where} must not be negative")
+    if sum(values) <= 0:
+        raise ValueError(f"rubric: {where} must not all be zero")
+    return values
+
+
+class Rubric:
+    """Weights and thresholds compiled from a rubric config dict (see rubric.json).
+
+    Facility criteria become one small closure each for single proposals,
+    and are grouped by rule into field/threshold arrays for ``score_frame``.
+    """
+
+    def __init__(self, config):
+        import payload
+
+        self.config = config
+        self.version = config.get("version")
+        if self.version is None:
+            raise ValueError("rubric: missing version")
+
+        weights = config.get("weights") or {}
+        self.need_weight = _number(weights, "need", "weights")
+        self.ops_weight = _number(weights, "ops", "weights")
+        self.loc_weight = _number(weights, "loc", "weights")
+        self.facility_weight = _number(weights, "facility", "weights")
+        # Maximum possible score per SCORE_COLUMNS entry
+        self.max_scores = dict(zip(SCORE_COLUMNS, (
+            self.need_weight, self.ops_weight, self.loc_weight, self.facility_weight,
+            self.need_weight + self.ops_weight + self.loc_weight + self.facility_weight,
+        )))
+
+        need = config.get("need") or {}
+        self.util_full_at = _positive(need, "util_full_at", "need")
+        self.process_improve_factor = _number(need, "process_improve_factor", "need")
+        self.bypass_plan_factor = _number(need, "bypass_plan_factor", "need")
+        self.external_planned = _number(need, "external_planned", "need")
+        self.external_unplanned = _number(need, "external_unplanned", "need")
+        self.restructure = _number(need, "restructure", "need")
+
+        ops = config.get("ops") or {}
+        self.hubs_radius_max = _number(ops, "hubs_radius_max", "ops")
+        self.airport_dist_max = _number(ops, "airport_dist_max", "ops")
+        self.highway_dist_max = _number(ops, "highway_dist_max", "ops")
+        ops_weights = ops.get("criterion_weights") or {}
+        self.hubs_w, self.air_w, self.highway_w, self.cost_w = (
+            _number(ops_weights, k, "ops.criterion_weights") for k in ("hubs", "air", "highway", "cost")
+        )
+        _weights((self.hubs_w, self.air_w, self.highway_w, self.cost_w), "ops.criterion_weights")
+        # A proposal with neither air nor surface operations is scored on hubs and cost alone.
+        if self.hubs_w + self.cost_w <= 0:
+            raise ValueError("rubric: ops.criterion_weights hubs and cost must not both be zero")
+
+        location = config.get("location") or {}
+        unknown = set(location) - set(LOCATION_FIELDS)
+        if unknown:
+            raise ValueError(f"rubric: unknown location fields {sorted(unknown)}")
+        self.location_fields = tuple(location)
+        self.location_weights = _weights(
+            tuple(_number(location, f, "location") for f in self.location_fields), "location weights"
+        )
+        self.location_total = sum(self.location_weights)
+
+        facility = config.get("facility") or {}
+        self.sqft_per_dock = _positive(facility, "sqft_per_dock", "facility")
+        criteria = facility.get("criteria") or []
+        if not criteria:
+            raise ValueError("rubric: facility.criteria is empty")
+        spec_fields = {field for field, _ in payload.PAYLOAD_SECTIONS["facility_specs"]}
+        self.facility_criteria = tuple(criteria)
+        self.facility_rules = tuple(self._compile(c, i, spec_fields) for i, c in enumerate(criteria))
+        self.facility_weights = _weights(tuple(
+            _number(c, "weight", f"facility.criteria[{i}]") if "weight" in c else 1.0 for i, c in enumerate(criteria)
+        ), "facility.criteria weights")
+        self.facility_total = sum(self.facility_weights)
+
+        # Vectorized form: criterion positions grouped by rule, with threshold arrays
+        def group(rule):
+            return [i for i, c in enumerate(criteria) if c["rule"] == rule]
+
+        self._at_least_v = (group("at_least"), [criteria[i]["field"] for i in group("at_least")],
+                            np.array([float(criteria[i]["min"]) for i in group("at_least")]))
+        self._between_v = (group("between"), [criteria[i]["field"] for i in group("between")],
+                           np.array([float(criteria[i]["min"]) for i in group("between")]),
+                           np.array([float(criteria[i]["max"]) for i in group("between")]))
+        self._flag_v = (group("flag"), [criteria[i]["field"] for i in group("flag")])
+
+    def _compile(self, criterion, i, spec_fields):
+        where = f"facility.criteria[{i}]"
+        rule = criterion.get("rule")
+        if rule not in FACILITY_RULES:
+            raise ValueError(f"rubric: {where}.rule must be one of {FACILITY_RULES}, got {rule!r}")
+        fields = list(criterion["fields"]) if rule == "all_at_least" else [criterion.get("field")]
+        unknown = [f for f in fields if f not in spec_fields]
+        if unknown:
+            raise ValueError(f"rubric: {where} refers to unknown facility fields {unknown}")
+        if rule == "at_least":
+            return _at_least_rule(criterion["field"], _number(criterion, "min", where))
+        if rule == "between":
+            return _between_rule(criterion["field"], _number(criterion, "min", where), _number(criterion, "max", where))
+        if rule == "flag":
+            return _flag_rule(criterion["field"])
+        if rule == "fraction":
+            return _fraction_rule(criterion["field"], _positive(criterion, "full_at", where))
+        if rule == "docks":
+            return _docks_rule(criterion["field"], self.sqft_per_dock)
+        return _all_at_least_rule({f: _number(criterion["fields"], f, where) for f in fields})
+
+    # --- Single proposal ---
+
+    def recommended_docks(self, req_area):
+        return (req_area / self.sqft_per_dock) if (req_area is not None and req_area > 0) else None
+
+    def need_score(self, need):
+        scenario = need.get("scenario")
+        if scenario == SCENARIO_OVERUTILIZATION:
+            util_score = min((need.get("util") or 0) / self.util_full_at, 1.0)
+            if need.get("process_improve"):
+                util_score *= self.process_improve_factor
+            if need.get("bypass_plan"):
+                util_score *= self.bypass_plan_factor
+            return util_score * self.need_weight
+        if scenario == SCENARIO_EXTERNAL:
+            ext_score = self.external_planned if need.get("ext_planned") == "Planned" else self.external_unplanned
+            return ext_score * self.need_weight
+        if scenario == SCENARIO_RESTRUCTURE:
+            res_score = self.restructure if need.get("restructure") else 0.0
+            return res_score * self.need_weight
+        return 0.0
+
+    def ops_score(self, ops_network):
+        ops = ops_network.get("ops_selected") or []
+        air = has_air(ops)
+        surface = has_surface(ops)
+
+        hubs_radius = ops_network.get("hubs_radius")
+        hubs_score = 1.0 if (hubs_radius is not None and hubs_radius <= self.hubs_radius_max) else 0.0
+        airport_dist = ops_network.get("airport_dist")
+        air_score = 1.0 if (air and airport_dist is not None and airport_dist <= self.airport_dist_max) else 0.0
+        highway_dist = ops_network.get("highway_dist")
+        highway_score = 1.0 if (surface and highway_dist is not None and highway_dist <= self.highway_dist_max) else 0.0
+
+        ratio = cost_ratio(ops_network.get("budget_cost_sft"), ops_network.get("proposed_cost_sft"))
+        cost_score = max(0.0, min(ratio, 1.0)) if ratio is not None else 0.0
+
+        op_weights = (self.air_w if air else 0.0) + (self.highway_w if surface else 0.0) + self.hubs_w + self.cost_w
+        score_sum = (
+            self.hubs_w * hubs_score + self.air_w * air_score
+            + self.highway_w * highway_score + self.cost_w * cost_score
+        )
+        return (score_sum / op_weights) * self.ops_weight
+
+    def loc_score(self, location):
+        hits = 0.0
+        for field, weight in zip(self.location_fields, self.location_weights):
+            if location.get(field):
+                hits += weight
+        return hits / self.location_total * self.loc_weight
+
+    def facility_spec_scores(self, specs):
+        """Per-criterion scores (0..1) for the Facility Specifications category, in rubric order."""
+        g = specs.get
+        return [rule(g) for rule in self.facility_rules]
+
+    def facility_score(self, specs):
+        total = 0.0
+        for weight, s in zip(self.facility_weights, self.facility_spec_scores(specs)):
+            total += weight * s
+        return (total / self.facility_total) * self.facility_weight
+
+    def score_proposal(self, payload):
+        """Score a ``payload.Proposal`` (or nested payload dict); returns a dict keyed by SCORE_COLUMNS."""
+        need = self.need_score(payload.get("need_identification") or {})
+        ops = self.ops_score(payload.get("operations_network") or {})
+        loc = self.loc_score(payload.get("location_strategy") or {})
+        fac = self.facility_score(payload.get("facility_specs") or {})
+        return dict(zip(SCORE_COLUMNS, (need, ops, loc, fac, need + ops + loc + fac)))
+
+    # --- Vectorized ---
+
+    def score_frame(self, inputs):
+        frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame(inputs)
+        ratio = _cost_ratio_v(frame)
+        need = self._need_score_v(frame)
+        ops = self._ops_score_v(frame, ratio)
+        loc = self._loc_score_v(frame)
+        fac = self._facility_score_v(frame)
+        req_area = _num(frame, "req_area")
+        return pd.DataFrame(
+            {
+                "cost_ratio": ratio,
+                "recommended_docks": np.where(req_area > 0, req_area / self.sqft_per_dock, np.nan),
+                "need_score": need,
+                "ops_score": ops,
+                "loc_score": loc,
+                "facility_score": fac,
+                "total_score": need + ops + loc + fac,
+            },
+            index=frame.index,
+        )
+
+    def criterion_inputs(self, inputs):
+        """What the category scores of many proposals are computed from, before any weight.
+
+        A dict of arrays aligned to the rows of ``inputs`` (as for
+        ``score_frame``): ``need`` (need score before its category weight,
+        0..1), the ops inputs ``hubs_radius``, ``airport_dist``,
+        ``highway_dist``, ``air``, ``surface`` and ``cost_score``,
+        ``location`` (rows x ``location_fields`` flags), ``facility``
+        (rows x criteria scores, 0..1) and ``facility_values`` ({field:
+        values} for the at_least/between criteria). Used to re-score under
+        other weights and thresholds without reading the frame again (see
+        sensitivity.py).
+        """
+        frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame(inputs)
+        return {
+            "need": self._need_unit_v(frame),
+            **self._ops_inputs_v(frame, _cost_ratio_v(frame)),
+            "location": self._location_flags_v(frame),
+            "facility": self._facility_criteria_v(frame),
+            "facility_values": {f: _num(frame, f) for f in self._at_least_v[1] + self._between_v[1]},
+        }
+
+    def _need_score_v(self, frame):
+        return self._need_unit_v(frame) * self.need_weight
+
+    def _need_unit_v(self, frame):
+        """Need score before the category weight (0..1)."""
+        scenario = _text(frame, "scenario")
+        util_score = np.minimum(np.nan_to_num(_num(frame, "util"), nan=0.0) / self.util_full_at, 1.0)
+        util_score = np.where(_flag(frame, "process_improve"), util_score * self.process_improve_factor, util_score)
+        util_score = np.where(_flag(frame, "bypass_plan"), util_score * self.bypass_plan_factor, util_score)
+        ext_score = np.where(_text(frame, "ext_planned") == "Planned", self.external_planned, self.external_unplanned)
+        res_score = np.where(_lists(frame, "restructure").map(bool).to_numpy(dtype=bool), self.restructure, 0.0)
+        return np.select(
+            [scenario == SCENARIO_OVERUTILIZATION, scenario == SCENARIO_EXTERNAL, scenario == SCENARIO_RESTRUCTURE],
+            [util_score, ext_score, res_score],
+            default=0.0,
+        )
+
+    def _ops_score_v(self, frame, ratio):
+        ops = self._ops_inputs_v(frame, ratio)
+        air, surface = ops["air"], ops["surface"]
+        hubs_score = np.where(ops["hubs_radius"] <= self.hubs_radius_max, 1.0, 0.0)
+        air_score = np.where(air & (ops["airport_dist"] <= self.airport_dist_max), 1.0, 0.0)
+        highway_score = np.where(surface & (ops["highway_dist"] <= self.highway_dist_max), 1.0, 0.0)
+        op_weights = np.where(air, self.air_w, 0.0) + np.where(surface, self.highway_w, 0.0) + self.hubs_w + self.cost_w
+        score_sum = (
+            self.hubs_w * hubs_score + self.air_w * air_score
+            + self.highway_w * highway_score + self.cost_w * ops["cost_score"]
+        )
+        return (score_sum / op_weights) * self.ops_weight
+
+    def _ops_inputs_v(self, frame, ratio):
+        ops = _lists(frame, "ops_selected")
+        return {
+            "hubs_radius": _num(frame, "hubs_radius"),
+            "airport_dist": _num(frame, "airport_dist"),
+            "highway_dist": _num(frame, "highway_dist"),
+            "air": _any_of(ops, AIR_OPERATIONS),
+            "surface": _any_of(ops, SURFACE_OPERATIONS),
+            "cost_score": np.where(np.isnan(ratio), 0.0, np.clip(ratio, 0.0, 1.0)),
+        }
+
+    def _loc_score_v(self, frame):
+        hits = np.zeros(len(frame))
+        for weight, flags in zip(self.location_weights, self._location_flags_v(frame).T):
+            hits = hits + np.where(flags, weight, 0.0)
+        return hits / self.location_total * self.loc_weight
+
+    def _location_flags_v(self, frame):
+        """Rows x ``location_fields`` booleans."""
+        flags = np.zeros((len(frame), len(self.location_fields)), dtype=bool)
+        for j, field in enumerate(self.location_fields):
+            flags[:, j] = _flag(frame, field)
+        return flags
+
+    def _facility_score_v(self, frame):
+        scores = self._facility_criteria_v(frame)
+        # Summed column by column, in rubric order, to match facility_score exactly.
+        total = np.zeros(len(frame))
+        for i, weight in enumerate(self.facility_weights):
+            total = total + weight * scores[:, i]
+        return (total / self.facility_total) * self.facility_weight
+
+    def _facility_criteria_v(self, frame):
+        """Rows x criteria scores (0..1), in rubric order."""
+        scores = np.zeros((len(frame), len(self.facility_rules)))
+        positions, fields, lows = self._at_least_v
+        if positions:
+            values = np.column_stack([_num(frame, f) for f in fields])
+            scores[:, positions] = np.where(values >= lows, 1.0, 0.0)
+        positions, fields, lows, highs = self._between_v
+        if positions:
+            values = np.column_stack([_num(frame, f) for f in fields])
+            scores[:, positions] = np.where((values >= lows) & (values <= highs), 1.0, 0.0)
+        positions, fields = self._flag_v
+        if positions:
+            scores[:, positions] = np.column_stack([_flag(frame, f) for f in fields])
+        for i, criterion in enumerate(self.facility_criteria):
+            rule = criterion["rule"]
+            if rule == "fraction":
+                full_at = float(criterion["full_at"])
+                scores[:, i] = np.minimum(np.nan_to_num(_num(frame, criterion["field"]), nan=0.0), full_at) / full_at
+            elif rule == "docks":
+                req_area = _num(frame, "req_area")
+                rec_docks = np.where(req_area > 0, req_area / self.sqft_per_dock, np.nan)
+                docks = _num(frame, criterion["field"])
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    scores[:, i] = np.where(
+                        np.isnan(rec_docks) | np.isnan(docks), 0.0,
+                        np.where(docks >= rec_docks, 1.0, docks / rec_docks),
+                    )
+            elif rule == "all_at_least":
+                ok = np.ones(len(frame), dtype=bool)
+                for field, low in criterion["fields"].items():
+                    ok &= _num(frame, field) >= float(low)
+                scores[:, i] = np.where(ok, 1.0, 0.0)
+        return scores
+
+
+def load_rubric(path=None):
+    """Read and compile a rubric config file; raises ValueError if it is malformed."""
+    with open(path or RUBRIC_PATH, encoding="utf-8") as f:
+        return Rubric(json.load(f))
+
+
+_rubrics = {}
+
+
+def current_rubric(path=None):
+    """The compiled rubric in ``path`` (default RUBRIC_PATH), recompiled when the file changes.
+
+    If a changed file cannot be read or compiled, the last good rubric is
+    kept (and the error logged) until the file changes again; only the first
+    load raises.
+    """
+    path = path or RUBRIC_PATH
+    cached = _rubrics.get(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        # e.g. an editor replacing the file; keep what was loaded
+        if cached is None:
+            raise
+        return cached[1]
+    if cached is None or cached[0] != mtime:
+        try:
+            rubric = load_rubric(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            if cached is None:
+                raise
+            log.exception("Reloading rubric %s failed; still scoring with version %s", path, cached[1].version)
+            rubric = cached[1]
+        cached = _rubrics[path] = (mtime, rubric)
+    return cached[1]
+
+
+# --- Single proposal ---
+
+def recommended_docks(req_area, rules=None):
+    return (rules or current_rubric()).recommended_docks(req_area)
+
+
+def need_score(need, rules=None):
+    return (rules or current_rubric()).need_score(need)
+
+
+def ops_score(ops_network, rules=None):
+    return (rules or current_rubric()).ops_score(ops_network)
+
+
+def loc_score(location, rules=None):
+    return (rules or current_rubric()).loc_score(location)
+
+
+def facility_spec_scores(specs, rules=None):
+    """Per-criterion scores (0..1) for the Facility Specifications category, in rubric order."""
+    return (rules or current_rubric()).facility_spec_scores(specs)
+
+
+def facility_score(specs, rules=None):
+    return (rules or current_rubric()).facility_score(specs)
+
+
+def score_proposal(payload, rules=None):
+    """Score a ``payload.Proposal`` (or nested payload dict); returns a dict keyed by SCORE_COLUMNS."""
+    return (rules or current_rubric()).score_proposal(payload)
+
+
+# --- Vectorized batch scoring ---
+#
+# Column readers for Rubric.score_frame. The vectorized rubric methods mirror
+# their scalar counterparts operation-for-operation (including summation
+# order) so batch results are bit-identical to the form.
+
+_TRUE_STRINGS = {"true", "t", "yes", "y", "1"}
+
+
+def _num(frame, key):
+    if key not in frame:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[key], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _flag(frame, key):
+    if key not in frame:
+        return np.zeros(len(frame), dtype=bool)
+    col = frame[key]
+    if pd.api.types.is_bool_dtype(col):
+        return col.fillna(False).to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(col):
+        return (col.fillna(0) != 0).to_numpy(dtype=bool)
+    as_text = col.astype("string").str.strip().str.lower()
+    return as_text.isin(_TRUE_STRINGS).fillna(False).to_numpy(dtype=bool)
+
+
+def _text(frame, key):
+    if key not in frame:
+        return np.full(len(frame), "", dtype=object)
+    return frame[key].fillna("").astype(str).to_numpy(dtype=object)
+
+
+def _lists(frame, key):
+    """Multiselect column as a Series of lists; text cells are split on ';'."""
+    if key not in frame:
+        return pd.Series([[] for _ in range(len(frame))], index=frame.index)
+
+    def to_list(v):
+        if isinstance(v, str):
+            return [part.strip() for part in v.split(";") if part.strip()]
+        if isinstance(v, (list, tuple, np.ndarray)):
+            return list(v)
+        return []
+
+    return frame[key].map(to_list)
+
+
+def _any_of(lists, options):
+    exploded = lists.explode()
+    hits = exploded.isin(options).groupby(level=0, sort=False).any()
+    return hits.reindex(lists.index, fill_value=False).to_numpy(dtype=bool)
+
+
+def _cost_ratio_v(frame):
+    budget = _num(frame, "budget_cost_sft")
+    proposed = _num(frame, "proposed_cost_sft")
+    valid = ~np.isnan(budget) & (proposed > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, budget / proposed, np.nan)
+
+
+def score_frame(inputs, rules=None):
+    """Score many proposals at once.
+
+    ``inputs`` is a DataFrame (or a dict of equal-length arrays) with one row
+    per proposal and columns named after the payload fields, e.g. ``scenario``,
+    ``util``, ``ops_selected``, ``req_area``. Missing columns count as
+    unanswered. Multiselect columns (``ops_selected``, ``restructure``) accept
+    lists or ';'-separated text. Returns a DataFrame aligned to the input with
+    ``cost_ratio``, ``recommended_docks`` and the SCORE_COLUMNS.
+    """
+    return (rules or current_rubric()).score_frame(inputs)
@@ -0,0 +1,202 @@
+"""What-if analysis: how facility rankings move when the rubric changes.
+
+A scenario sets some rubric parameters, named by their place in rubric.json:
+
+    weights.need, weights.ops, weights.loc, weights.facility
+    ops.hubs_radius_max, ops.airport_dist_max, ops.highway_dist_max
+    location.<field>                       location item weights
+    facility.<field>.min / .max            at_least and between thresholds
+
+Parameters a scenario leaves out keep their rubric value. ``grid`` and
+``monte_carlo`` build scenario tables; ``analyze`` scores every facility
+under every scenario and reports how stable each facility's rank is.
+
+Each category score is a weighted sum of criterion scores in 0..1, so the
+criterion scores are read from the proposals once
+(``Rubric.criterion_inputs``). A block of scenarios is then a few array
+operations over (facilities x scenarios) matrices: weights are products,
+thresholds are broadcast comparisons, and ranks come from one argsort per
+block. Thousands of scenarios over thousands of facilities take seconds.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import scoring
+
+WEIGHTS = ("weights.need", "weights.ops", "weights.loc", "weights.facility")
+OPS_THRESHOLDS = ("ops.hubs_radius_max", "ops.airport_dist_max", "ops.highway_dist_max")
+# Scenario tables larger than this are refused by the dashboard.
+MAX_SCENARIOS = 20000
+# Cells per (facilities x scenarios) block; bounds memory however many scenarios there are.
+BLOCK_CELLS = 4_000_000
+
+
+def parameters(rules=None):
+    """{parameter: value in the rubric} for every parameter a scenario can set."""
+    rules = rules or scoring.current_rubric()
+    params = dict(zip(WEIGHTS, (rules.need_weight, rules.ops_weight, rules.loc_weight, rules.facility_weight)))
+    params.update(zip(OPS_THRESHOLDS, (rules.hubs_radius_max, rules.airport_dist_max, rules.highway_dist_max)))
+    params.update((f"location.{field}", w) for field, w in zip(rules.location_fields, rules.location_weights))
+    for criterion in rules.facility_criteria:
+        if criterion["rule"] in ("at_least", "between"):
+            params[f"facility.{criterion['field']}.min"] = float(criterion["min"])
+        if criterion["rule"] == "between":
+            params[f"facility.{criterion['field']}.max"] = float(criterion["max"])
+    return params
+
+
+def grid(axes):
+    """Every combination of ``{parameter: values}``, one scenario per row."""
+    names = list(axes)
+    return pd.DataFrame(list(itertools.product(*(axes[n] for n in names))), columns=names, dtype=float)
+
+
+def monte_carlo(ranges, n, seed=0):
+    """``n`` scenarios with each parameter drawn uniformly from its ``(low, high)`` range."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({name: rng.uniform(low, high, n) for name, (low, high) in ranges.items()})
+
+
+def _ranks(totals):
+    """1-based rank of each row per column, highest total first; ties keep row order."""
+    order = np.argsort(-totals, axis=0, kind="stable")
+    ranks = np.empty(totals.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, np.arange(1, totals.shape[0] + 1)[:, None], axis=0)
+    return ranks
+
+
+class _Scorer:
+    """Total scores of the same proposals under blocks of scenarios."""
+
+    def __init__(self, inputs, rules):
+        self.rules = rules
+        self.x = rules.criterion_inputs(inputs)
+        self.op_weights = (
+            np.where(self.x["air"], rules.air_w, 0.0) + np.where(self.x["surface"], rules.highway_w, 0.0)
+            + rules.hubs_w + rules.cost_w
+        )
+        self.facility_weights = np.array(rules.facility_weights)
+        self.facility_sum = self.x["facility"] @ self.facility_weights
+        self.location = self.x["location"].astype(float)
+        # threshold parameter -> criterion position
+        self.thresholds = {}
+        for i, criterion in enumerate(rules.facility_criteria):
+            if criterion["rule"] in ("at_least", "between"):
+                self.thresholds[f"facility.{criterion['field']}.min"] = i
+            if criterion["rule"] == "between":
+                self.thresholds[f"facility.{criterion['field']}.max"] = i
+
+    def totals(self, p, varied):
+        """(rows x scenarios) totals; ``p`` maps every parameter to one value per scenario."""
+        x, rules = self.x, self.rules
+        hubs = np.where(x["hubs_radius"][:, None] <= p["ops.hubs_radius_max"], 1.0, 0.0)
+        air = np.where(x["air"][:, None] & (x["airport_dist"][:, None] <= p["ops.airport_dist_max"]), 1.0, 0.0)
+        highway = np.where(
+            x["surface"][:, None] & (x["highway_dist"][:, None] <= p["ops.highway_dist_max"]), 1.0, 0.0
+        )
+        ops = (
+            rules.hubs_w * hubs + rules.air_w * air + rules.highway_w * highway + rules.cost_w * x["cost_score"][:, None]
+        ) / self.op_weights[:, None]
+
+        location_weights = np.vstack([p[f"location.{field}"] for field in rules.location_fields])
+        loc = (self.location @ location_weights) / location_weights.sum(axis=0)
+
+        facility = np.repeat(self.facility_sum[:, None], len(p["weights.need"]), axis=1)
+        for i in sorted({self.thresholds[name] for name in varied if name in self.thresholds}):
+            field = rules.facility_criteria[i]["field"]
+            values = x["facility_values"][field][:, None]
+            hit = values >= p[f"facility.{field}.min"]
+            if rules.facility_criteria[i]["rule"] == "between":
+                hit &= values <= p[f"facility.{field}.max"]
+            facility += self.facility_weights[i] * (hit - x["facility"][:, i][:, None])
+        facility /= rules.facility_total
+
+        return (
+            x["need"][:, None] * p["weights.need"] + ops * p["weights.ops"]
+            + loc * p["weights.loc"] + facility * p["weights.facility"]
+        )
+
+
+def analyze(inputs, scenarios, rules=None, top_k=20):
+    """Score every proposal under every scenario and compare the rankings with the rubric's own.
+
+    ``inputs`` is a frame of proposals as for ``scoring.score_frame`` (a
+    ``facility_code`` column, if present, is carried into the result);
+    ``scenarios`` a frame with one column per parameter (see ``parameters``).
+    Returns ``(facilities, scenarios)`` frames:
+
+    - facilities: ``base_score`` and ``base_rank`` under the rubric,
+      ``best_rank``, ``worst_rank``, ``mean_rank`` and ``rank_std`` over the
+      scenarios, ``top_k_share`` (fraction of scenarios in which it ranks in
+      the top ``top_k``) and ``flips`` (scenarios in which it enters or
+      leaves the top ``top_k``), in base rank order.
+    - scenarios: the scenario parameters plus ``spearman`` (rank
+      correlation with the base ranking), ``top_k_kept`` (how many of the
+      base top ``top_k`` stay in it) and ``rank_changes`` (facilities whose
+      rank differs).
+    """
+    rules = rules or scoring.current_rubric()
+    base = parameters(rules)
+    unknown = [name for name in scenarios.columns if name not in base]
+    if unknown:
+        raise ValueError(f"unknown scenario parameters {unknown}; expected some of {sorted(base)}")
+    frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame(inputs)
+    n, m = len(frame), len(scenarios)
+    top_k = max(1, min(int(top_k), n))
+    varied = list(scenarios.columns)
+    scorer = _Scorer(frame, rules)
+
+    base_total = scorer.totals({name: np.array([value]) for name, value in base.items()}, varied)[:, 0]
+    base_rank = _ranks(base_total[:, None])[:, 0]
+    base_top = base_rank <= top_k
+
+    best = np.full(n, n + 1, dtype=np.int64)
+    worst = np.zeros(n, dtype=np.int64)
+    rank_sum = np.zeros(n)
+    rank_sq = np.zeros(n)
+    in_top = np.zeros(n, dtype=np.int64)
+    flips = np.zeros(n, dtype=np.int64)
+    spearman = np.ones(m)
+    kept = np.zeros(m, dtype=np.int64)
+    changes = np.zeros(m, dtype=np.int64)
+
+    block = max(1, BLOCK_CELLS // max(n, 1))
+    columns = {name: scenarios[name].to_numpy(dtype=float) for name in varied}
+    for start in range(0, m, block):
+        stop = min(start + block, m)
+        p = {
+            name: columns[name][start:stop] if name in columns else np.full(stop - start, value)
+            for name, value in base.items()
+        }
+        ranks = _ranks(scorer.totals(p, varied))
+        top = ranks <= top_k
+        np.minimum(best, ranks.min(axis=1), out=best)
+        np.maximum(worst, ranks.max(axis=1), out=worst)
+        rank_sum += ranks.sum(axis=1)
+        rank_sq += (ranks.astype(float) ** 2).sum(axis=1)
+        in_top += top.sum(axis=1)
+        flips += (top != base_top[:, None]).sum(axis=1)
+        d2 = ((ranks - base_rank[:, None]).astype(float) ** 2).sum(axis=0)
+        if n > 1:
+            spearman[start:stop] = 1.0 - 6.0 * d2 / (n * (n * n - 1.0))
+        kept[start:stop] = (top & base_top[:, None]).sum(axis=0)
+        changes[start:stop] = (ranks != base_rank[:, None]).sum(axis=0)
+
+    mean = rank_sum / m if m else np.full(n, np.nan)
+    facilities = pd.DataFrame({
+        "base_score": base_total,
+        "base_rank": base_rank,
+        "best_rank": best if m else base_rank,
+        "worst_rank": worst if m else base_rank,
+        "mean_rank": mean,
+        "rank_std": np.sqrt(np.maximum(rank_sq / m - mean ** 2, 0.0)) if m else np.full(n, np.nan),
+        "top_k_share": in_top / m if m else np.full(n, np.nan),
+        "flips": flips,
+    })
+    if "facility_code" in frame:
+        facilities.insert(0, "facility_code", frame["facility_code"].to_numpy())
+    facilities = facilities.sort_values("base_rank", kind="stable").reset_index(drop=True)
+    outcome = scenarios.reset_index(drop=True).assign(spearman=spearman, top_k_kept=kept, rank_changes=changes)
+    return facilities, outcome
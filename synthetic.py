@@ -0,0 +1,213 @@
+"""Synthetic facility proposals for benchmarks and scale testing.
+
+    python synthetic.py --rows 5000000 --db big.db --workers 8
+    python synthetic.py --rows 100000 -o broker_list.csv       # or .jsonl, input for bulk_score.py
+
+Proposals are ``payload.Proposal`` objects, the same schema the Submit
+Proposal form saves, spread around Indian cities and scored under the
+current rubric like the form would score them. Every row draws from its own
+random stream seeded by ``(seed, index)``, so a seed always gives the same
+rows, however they are batched or split across worker processes.
+
+``populate`` writes them to a database a batch at a time: each batch is
+generated (by a process pool with ``workers`` > 1) and written with one
+``executemany`` in one transaction. ``write_fixture`` writes unscored rows
+as CSV or JSONL in the column layout bulk_score.py reads.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+import bulk_score
+import db
+import payload
+import rescore
+import scoring
+
+BATCH_SIZE = 50_000
+FIXTURE_BATCH_SIZE = 10_000
+
+# (latitude, longitude) of cities the synthetic sites cluster around
+CITIES = (
+    (28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (13.08, 80.27), (22.57, 88.36), (17.39, 78.49),
+    (18.52, 73.86), (23.02, 72.57), (26.91, 75.79), (26.85, 80.95), (21.15, 79.09), (30.73, 76.78),
+)
+
+
+def _maybe(rng, value, missing=0.15):
+    return None if rng.random() < missing else value
+
+
+def proposal(rng, index, rules=None):
+    """One scored proposal for facility ``FC{index:07d}``."""
+    lat, lon = rng.choice(CITIES)
+    scenario = rng.choice(scoring.SCENARIOS[1:])
+    ops = rng.sample(scoring.OPERATIONS, rng.randint(1, 3))
+    req_area = rng.randrange(20000, 400000, 5000)
+    p = payload.Proposal(
+        submitter=payload.Submitter(
+            facility_code=f"FC{index:07d}",
+            employee_id=f"E{rng.randint(1, 5000):05d}",
+            latitude=round(lat + rng.gauss(0, 0.4), 6),
+            longitude=round(lon + rng.gauss(0, 0.4), 6),
+            drive_link="",
+        ),
+        need_identification=payload.NeedIdentification(
+            scenario=scenario,
+            util=rng.randint(50, 120) if scenario == scoring.SCENARIO_OVERUTILIZATION else None,
+            process_improve=(rng.random() < 0.3) or None,
+            bypass_plan=(rng.random() < 0.3) or None,
+            ext_planned=rng.choice(("Planned", "Sudden/Unplanned")) if scenario == scoring.SCENARIO_EXTERNAL else None,
+            restructure=(
+                rng.sample(scoring.RESTRUCTURE_REASONS, rng.randint(1, 2))
+                if scenario == scoring.SCENARIO_RESTRUCTURE else None
+            ),
+        ),
+        operations_network=payload.OperationsNetwork(
+            ops_selected=ops,
+            hubs_radius=rng.randint(0, 4),
+            airport_dist=round(rng.uniform(2, 60), 1) if scoring.has_air(ops) else None,
+            highway_dist=round(rng.uniform(0.5, 40), 1) if scoring.has_surface(ops) else None,
+            budget_cost_sft=_maybe(rng, round(rng.uniform(20, 60), 1)),
+            proposed_cost_sft=_maybe(rng, round(rng.uniform(20, 70), 1)),
+        ),
+        location_strategy=payload.LocationStrategy(
+            **{field: rng.random() < 0.6 for field in scoring.LOCATION_FIELDS}
+        ),
+        facility_specs=payload.FacilitySpecs(
+            exp_life=_maybe(rng, rng.randint(1, 10)),
+            req_area=req_area,
+            clear_height=_maybe(rng, round(rng.uniform(20, 45), 1)),
+            skylight=rng.random() < 0.5,
+            vent=rng.random() < 0.5,
+            pillar_width=_maybe(rng, round(rng.uniform(15, 40), 1)),
+            pillar_length=_maybe(rng, round(rng.uniform(50, 100), 1)),
+            floor_load=_maybe(rng, round(rng.uniform(2, 8), 1)),
+            docks=_maybe(rng, rng.randint(4, 200)),
+            enclosed_pct=_maybe(rng, rng.randint(0, 30)),
+            dock_height=_maybe(rng, round(rng.uniform(8, 18), 1)),
+            leveller_pct=_maybe(rng, rng.randint(0, 100)),
+            canopy_len=_maybe(rng, round(rng.uniform(5, 25), 1)),
+            clearance_height=_maybe(rng, round(rng.uniform(12, 25), 1)),
+            side_clearance=_maybe(rng, round(rng.uniform(5, 15), 1)),
+            tail_mate=rng.random() < 0.5,
+            dual_sided=rng.random() < 0.4,
+            hcv_slots=_maybe(rng, rng.randint(0, 12)),
+            mcv_slots=_maybe(rng, rng.randint(0, 20)),
+            car_slots=_maybe(rng, rng.randint(0, 10)),
+            two_wheeler_slots=_maybe(rng, rng.randint(0, 80)),
+            fire_compliant=rng.random() < 0.7,
+            office_space_pct=_maybe(rng, round(rng.uniform(1, 8), 1)),
+            fiber_ready=rng.random() < 0.6,
+            driver_area=rng.random() < 0.5,
+            beds=_maybe(rng, rng.randint(0, 10)),
+        ),
+    )
+    rescore.rescore_payload(p, rules or scoring.current_rubric())
+    return p
+
+
+def _rng(seed, index):
+    """Row ``index``'s own random stream."""
+    return random.Random(seed * 2**40 + index)
+
+
+def proposals(n, seed=0, start=0):
+    """``n`` proposals for facilities ``start`` .. ``start + n - 1``, the same for the same seed."""
+    rules = scoring.current_rubric()
+    for index in range(start, start + n):
+        yield proposal(_rng(seed, index), index, rules)
+
+
+def _ranges(n, start, size):
+    return [(low, min(low + size, start + n)) for low in range(start, start + n, size)]
+
+
+def records(task):
+    """Pool worker: ``(seed, start, stop)`` -> ``db.submission_record`` tuples of those facilities."""
+    seed, start, stop = task
+    return [db.submission_record(p) for p in proposals(stop - start, seed, start)]
+
+
+def populate(db_path, n, seed=0, start=0, batch_size=BATCH_SIZE, workers=1):
+    """Write ``n`` synthetic submissions to ``db_path`` (migrated first); returns the number written.
+
+    One transaction per ``batch_size`` rows. With ``workers`` > 1 the rows
+    are generated in that many processes while this one writes.
+    """
+    tasks = [(seed, low, high) for low, high in _ranges(n, start, batch_size)]
+    conn = db.get_connection(db_path)
+    pool = None
+    written = 0
+    try:
+        db.init_db(conn)
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            batches = pool.imap(records, tasks)
+        else:
+            batches = map(records, tasks)
+        for batch in batches:
+            written += db.upsert_submissions(conn, batch)
+        if pool is not None:
+            pool.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        conn.close()
+    return written
+
+
+def write_fixture(out, n, fmt="csv", seed=0, start=0, batch_size=FIXTURE_BATCH_SIZE):
+    """Write ``n`` proposals to the text file ``out`` as bulk_score.py input: payload field columns, unscored."""
+    columns = [field for field in payload.FIELD_KINDS if field not in payload.DERIVED_FIELDS]
+    for i, (low, high) in enumerate(_ranges(n, start, batch_size)):
+        rows = [payload.flatten(p) for p in proposals(high - low, seed, low)]
+        # object dtype keeps integer fields integral where some rows leave them empty
+        frame = pd.DataFrame(rows, columns=list(payload.FIELD_KINDS), dtype=object)[columns]
+        bulk_score.write_chunk(frame, out, fmt, header=(i == 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic facility proposals.")
+    parser.add_argument("--rows", type=int, default=100_000, help="proposals to generate (default: 100000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", type=int, default=0, help="index of the first facility code (FC<index>)")
+    parser.add_argument("--db", metavar="PATH", help="write them to this submissions database")
+    parser.add_argument("-o", "--output", metavar="PATH", help="write them as a CSV/JSONL fixture ('-' for stdout)")
+    parser.add_argument("--format", choices=bulk_score.FORMATS, help="fixture format (default: the output extension)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="generating processes for --db (default: all cores)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, help=f"rows per --db transaction (default: {BATCH_SIZE})"
+    )
+    args = parser.parse_args(argv)
+    if not args.db and not args.output:
+        parser.error("give --db and/or --output")
+
+    if args.db:
+        started = time.perf_counter()
+        written = populate(args.db, args.rows, args.seed, args.start, args.batch_size, args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {written} submissions to {args.db} in {elapsed:.1f}s ({written / elapsed:.0f}/s).", file=sys.stderr)
+    if args.output:
+        fmt = args.format or bulk_score.detect_format(args.output)
+        out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        try:
+            write_fixture(out, args.rows, fmt, args.seed, args.start)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if out is not sys.stdout:
+            print(f"Wrote {args.rows} proposals to {args.output}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())